@@ -0,0 +1,305 @@
+import os
+import time
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.session import engine as default_engine
+from ..models import ChatCheckpoint, ChatThread, ChatWrite
+
+load_dotenv()
+
+CHAT_THREAD_TTL_SECONDS = float(os.getenv("CHAT_THREAD_TTL_SECONDS", str(7 * 24 * 3600)))
+CHAT_MAX_THREADS = int(os.getenv("CHAT_MAX_THREADS", "10000"))
+CHAT_CHECKPOINT_HISTORY = int(os.getenv("CHAT_CHECKPOINT_HISTORY", "2"))
+CHAT_CLEANUP_INTERVAL_SECONDS = float(os.getenv("CHAT_CLEANUP_INTERVAL_SECONDS", "300"))
+
+_DELETE_CHUNK = 500
+
+
+def _insert(conn: AsyncConnection, table):
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+class SQLCheckpointSaver(BaseCheckpointSaver):
+    """Чекпоинтер LangGraph в основной базе приложения.
+
+    Хранит только последние ``history`` чекпоинтов каждого потока, удаляет потоки,
+    неактивные дольше ``ttl`` секунд, и держит не больше ``max_threads`` потоков.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine = default_engine,
+        *,
+        ttl: float = CHAT_THREAD_TTL_SECONDS,
+        max_threads: int = CHAT_MAX_THREADS,
+        history: int = CHAT_CHECKPOINT_HISTORY,
+        cleanup_interval: float = CHAT_CLEANUP_INTERVAL_SECONDS,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.engine = engine
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.history = max(history, 1)
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = time.monotonic()
+
+    def _to_tuple(self, row, writes) -> CheckpointTuple:
+        configurable = {
+            "thread_id": row.thread_id,
+            "checkpoint_ns": row.checkpoint_ns,
+            "checkpoint_id": row.checkpoint_id,
+        }
+        parent_config = None
+        if row.parent_checkpoint_id:
+            parent_config = {
+                "configurable": {**configurable, "checkpoint_id": row.parent_checkpoint_id}
+            }
+        return CheckpointTuple(
+            config={"configurable": configurable},
+            checkpoint=self.serde.loads_typed((row.type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.metadata)),
+            parent_config=parent_config,
+            pending_writes=[
+                (write.task_id, write.channel, self.serde.loads_typed((write.type, write.value)))
+                for write in writes
+            ],
+        )
+
+    async def _load_writes(self, conn: AsyncConnection, row) -> list:
+        table = ChatWrite.__table__
+        result = await conn.execute(
+            select(table)
+            .where(
+                table.c.thread_id == row.thread_id,
+                table.c.checkpoint_ns == row.checkpoint_ns,
+                table.c.checkpoint_id == row.checkpoint_id,
+            )
+            .order_by(table.c.task_id, table.c.idx)
+        )
+        return list(result)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        table = ChatCheckpoint.__table__
+
+        async with self.engine.connect() as conn:
+            updated_at = await conn.scalar(
+                select(ChatThread.updated_at).where(ChatThread.thread_id == thread_id)
+            )
+            if updated_at is None:
+                return None
+            if updated_at < time.time() - self.ttl:
+                await self._delete_threads(conn, [thread_id])
+                await conn.commit()
+                return None
+
+            stmt = select(table).where(
+                table.c.thread_id == thread_id,
+                table.c.checkpoint_ns == checkpoint_ns,
+            )
+            if checkpoint_id:
+                stmt = stmt.where(table.c.checkpoint_id == checkpoint_id)
+            else:
+                stmt = stmt.order_by(table.c.checkpoint_id.desc()).limit(1)
+            row = (await conn.execute(stmt)).first()
+            if row is None:
+                return None
+            return self._to_tuple(row, await self._load_writes(conn, row))
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        table = ChatCheckpoint.__table__
+        stmt = select(table).order_by(table.c.checkpoint_id.desc())
+        if config:
+            stmt = stmt.where(table.c.thread_id == config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                stmt = stmt.where(table.c.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                stmt = stmt.where(table.c.checkpoint_id == checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            stmt = stmt.where(table.c.checkpoint_id < before_id)
+
+        async with self.engine.connect() as conn:
+            rows = list(await conn.execute(stmt))
+            for row in rows:
+                if limit is not None and limit <= 0:
+                    break
+                checkpoint_tuple = self._to_tuple(row, await self._load_writes(conn, row))
+                if filter and not all(
+                    checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                if limit is not None:
+                    limit -= 1
+                yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_serializable_checkpoint_metadata(config, metadata)
+        )
+        table = ChatCheckpoint.__table__
+
+        async with self.engine.begin() as conn:
+            values = {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+                "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+                "type": checkpoint_type,
+                "checkpoint": checkpoint_blob,
+                "metadata_type": metadata_type,
+                "metadata": metadata_blob,
+            }
+            stmt = _insert(conn, table).values(**values)
+            await conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[table.c.thread_id, table.c.checkpoint_ns, table.c.checkpoint_id],
+                    set_={key: stmt.excluded[key] for key in ("type", "checkpoint", "metadata_type", "metadata")},
+                )
+            )
+            await self._touch_thread(conn, thread_id)
+            await self._prune_history(conn, thread_id, checkpoint_ns)
+
+        await self._maybe_cleanup()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if not writes:
+            return
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append({
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": configurable["checkpoint_id"],
+                "task_id": task_id,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+                "channel": channel,
+                "type": value_type,
+                "value": value_blob,
+                "task_path": task_path,
+            })
+
+        table = ChatWrite.__table__
+        async with self.engine.begin() as conn:
+            stmt = _insert(conn, table)
+            # Служебные записи (ошибки, прерывания) перезаписываются, обычные — только дописываются
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[c for c in table.primary_key.columns],
+                    set_={key: stmt.excluded[key] for key in ("channel", "type", "value", "task_path")},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing()
+            await conn.execute(stmt, rows)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.engine.begin() as conn:
+            await self._delete_threads(conn, [thread_id])
+
+    async def purge_expired(self) -> int:
+        """Удаляет потоки старше TTL и самые старые потоки сверх лимита; возвращает их число."""
+        thread = ChatThread.__table__
+        async with self.engine.begin() as conn:
+            expired = await conn.scalars(
+                select(thread.c.thread_id).where(thread.c.updated_at < time.time() - self.ttl)
+            )
+            overflow = await conn.scalars(
+                select(thread.c.thread_id)
+                .order_by(thread.c.updated_at.desc())
+                .offset(self.max_threads)
+            )
+            stale = list(set(expired) | set(overflow))
+            await self._delete_threads(conn, stale)
+        return len(stale)
+
+    async def _maybe_cleanup(self) -> None:
+        if time.monotonic() - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = time.monotonic()
+        await self.purge_expired()
+
+    async def _touch_thread(self, conn: AsyncConnection, thread_id: str) -> None:
+        table = ChatThread.__table__
+        stmt = _insert(conn, table).values(thread_id=thread_id, updated_at=time.time())
+        await conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.thread_id],
+                set_={"updated_at": stmt.excluded.updated_at},
+            )
+        )
+
+    async def _prune_history(self, conn: AsyncConnection, thread_id: str, checkpoint_ns: str) -> None:
+        table = ChatCheckpoint.__table__
+        old_ids = list(await conn.scalars(
+            select(table.c.checkpoint_id)
+            .where(table.c.thread_id == thread_id, table.c.checkpoint_ns == checkpoint_ns)
+            .order_by(table.c.checkpoint_id.desc())
+            .offset(self.history)
+        ))
+        if not old_ids:
+            return
+        for model in (ChatCheckpoint, ChatWrite):
+            await conn.execute(
+                delete(model).where(
+                    model.thread_id == thread_id,
+                    model.checkpoint_ns == checkpoint_ns,
+                    model.checkpoint_id.in_(old_ids),
+                )
+            )
+
+    async def _delete_threads(self, conn: AsyncConnection, thread_ids: list[str]) -> None:
+        for start in range(0, len(thread_ids), _DELETE_CHUNK):
+            chunk = thread_ids[start:start + _DELETE_CHUNK]
+            for model in (ChatWrite, ChatCheckpoint, ChatThread):
+                await conn.execute(delete(model).where(model.thread_id.in_(chunk)))
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from langchain_core.messages import ToolMessage
+
+from ..metrics import agent_steps, tool_calls, tool_latency
+from .tools import batch_runners, read_only_tools, tool_response, tools
+
+load_dotenv()
+
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+
+tools_by_name = {tool.name: tool for tool in tools}
+
+
+def _error_message(call: dict, error: str) -> ToolMessage:
+    return ToolMessage(
+        content=tool_response(False, error=error),
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+    )
+
+
+def _succeeded(message: ToolMessage) -> bool:
+    try:
+        return message.status != "error" and json.loads(message.content).get("success", True)
+    except (TypeError, ValueError, AttributeError):
+        return message.status != "error"
+
+
+def _record(name: str, messages: list[ToolMessage], started: float) -> None:
+    tool_latency.observe(time.perf_counter() - started, name)
+    for message in messages:
+        tool_calls.inc(name, "ok" if _succeeded(message) else "error")
+
+
+async def _run_single(call: dict) -> ToolMessage:
+    tool = tools_by_name.get(call["name"])
+    if tool is None:
+        return _error_message(call, f"Инструмент {call['name']} не найден")
+    started = time.perf_counter()
+    try:
+        message = await tool.ainvoke({**call, "type": "tool_call"})
+    except Exception as e:
+        message = _error_message(call, f"Ошибка при вызове инструмента {call['name']}: {str(e)}")
+    _record(call["name"], [message], started)
+    return message
+
+
+async def _run_batch(name: str, calls: list[dict]) -> list[ToolMessage]:
+    tool = tools_by_name[name]
+    messages: list[ToolMessage | None] = [None] * len(calls)
+    items, positions = [], []
+    for position, call in enumerate(calls):
+        try:
+            # exclude_unset: неуказанный аргумент и явный null различаются, как при одиночном вызове
+            items.append(tool.args_schema.model_validate(call["args"]).model_dump(exclude_unset=True))
+            positions.append(position)
+        except Exception as e:
+            messages[position] = _error_message(call, f"Некорректные аргументы: {str(e)}")
+
+    if items:
+        started = time.perf_counter()
+        results = await batch_runners[name](items)
+        for position, result in zip(positions, results):
+            call = calls[position]
+            messages[position] = ToolMessage(
+                content=tool_response(**result), name=name, tool_call_id=call["id"]
+            )
+        _record(name, [messages[position] for position in positions], started)
+    return messages
+
+
+def _segments(calls: list[dict]) -> list[tuple[str, list[dict]]]:
+    """Подряд идущие чтения — один сегмент «read», подряд идущие вызовы одной записи — сегмент записи."""
+    segments: list[tuple[str, list[dict]]] = []
+    for call in calls:
+        kind = "read" if call["name"] in read_only_tools else call["name"]
+        if segments and segments[-1][0] == kind:
+            segments[-1][1].append(call)
+        else:
+            segments.append((kind, [call]))
+    return segments
+
+
+async def execute_tool_calls(state: dict) -> dict:
+    """Узел графа вместо ToolNode.
+
+    Вызовы выполняются в порядке, в котором их выдала модель. Подряд идущие чтения
+    выполняются параллельно (не больше TOOL_CONCURRENCY одновременно), подряд идущие
+    вызовы одной записи — одной транзакцией; чтение никогда не идёт одновременно с записью.
+    """
+    agent_steps.inc("tools")
+    calls = state["messages"][-1].tool_calls
+    results: dict[str, ToolMessage] = {}
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def run_read(call: dict) -> None:
+        async with semaphore:
+            results[call["id"]] = await _run_single(call)
+
+    for kind, group in _segments(calls):
+        if kind == "read":
+            await asyncio.gather(*(run_read(call) for call in group))
+        elif len(group) > 1 and kind in batch_runners:
+            for call, message in zip(group, await _run_batch(kind, group)):
+                results[call["id"]] = message
+        else:
+            for call in group:
+                results[call["id"]] = await _run_single(call)
+    return {"messages": [results[call["id"]] for call in calls]}
@@ -1,40 +1,93 @@
+import time
 from typing import TypedDict, Annotated
 
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, get_buffer_string
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langgraph.constants import END
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import END, TAG_NOSTREAM
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import tools_condition
 
-from .llm import system_prompt
-from .tools import llm_with_tools, tools
+from ..metrics import agent_steps, llm_latency
+from .checkpoint import SQLCheckpointSaver
+from .executor import execute_tool_calls
+from .history import CHAT_HISTORY_SUMMARY, approx_tokens, history_stats, record_call, select_history
+from .llm import llm, summary_prompt, system_prompt
+from .resilience import guarded
+from .tools import llm_with_tools
 
 prompt = ChatPromptTemplate.from_messages([
-    ("system", system_prompt),
+    ("system", system_prompt + "{summary}"),
     MessagesPlaceholder("messages"),
 ])
 
-chain = prompt | llm_with_tools
+chain = prompt | guarded(llm_with_tools)
+
+# Сводка не должна попадать в поток токенов /chat/stream
+summary_chain = ChatPromptTemplate.from_messages([
+    ("system", summary_prompt),
+    ("human", "Предыдущее краткое содержание:\n{summary}\n\nНовые сообщения:\n{dialog}"),
+]) | guarded(llm.with_config(tags=[TAG_NOSTREAM]))
+
+SYSTEM_PROMPT_TOKENS = len(system_prompt) // 4
 
 class State(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    summary: str
+
+async def timed_llm_call(runnable, payload: dict):
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await runnable.ainvoke(payload)
+        status = "ok"
+        return result
+    finally:
+        llm_latency.observe(time.perf_counter() - started, status)
+
+async def summarize(summary: str, dropped: list[BaseMessage]) -> str:
+    result = await timed_llm_call(summary_chain, {
+        "summary": summary or "нет",
+        "dialog": get_buffer_string(dropped),
+    })
+    history_stats["summaries"] += 1
+    return result.content
 
 async def agent_node(state: State):
-    result = await chain.ainvoke({"messages": state["messages"]})
-    return {"messages": [result]}
+    agent_steps.inc("agent")
+    sent, dropped = select_history(state["messages"])
+    summary = state.get("summary", "")
+    update: dict = {"messages": []}
+    if dropped and CHAT_HISTORY_SUMMARY:
+        # Старые ходы сворачиваются в сводку и удаляются из состояния потока
+        summary = await summarize(summary, dropped)
+        update["summary"] = summary
+        update["messages"] = [RemoveMessage(id=message.id) for message in dropped]
 
-tool_node = ToolNode(tools)
+    summary_block = f"\n\nКраткое содержание предыдущей части беседы: {summary}" if summary else ""
+    record_call(SYSTEM_PROMPT_TOKENS + len(summary_block) // 4 + approx_tokens(sent), len(dropped))
+    result = await timed_llm_call(chain, {"messages": sent, "summary": summary_block})
+    update["messages"].append(result)
+    return update
 
 graph = StateGraph(State)
 graph.add_node("agent", agent_node)
-graph.add_node("tools", tool_node)
+graph.add_node("tools", execute_tool_calls)
 
 graph.add_conditional_edges("agent", tools_condition,
                             {"tools": "tools", "__end__": END})
 graph.add_edge("tools", "agent")
 graph.set_entry_point("agent")
 
-memory = MemorySaver()
-app = graph.compile(checkpointer=memory)
+checkpointer = SQLCheckpointSaver()
+app = graph.compile(checkpointer=checkpointer)
+
+
+async def record_exchange(config: RunnableConfig, question: str, answer: str) -> None:
+    # Ответ получен в обход графа; сохраняем его в поток, чтобы беседу можно было продолжить
+    await app.aupdate_state(
+        config,
+        {"messages": [HumanMessage(content=question), AIMessage(content=answer)]},
+        as_node="agent",
+    )
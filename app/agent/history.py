@@ -0,0 +1,79 @@
+import os
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, HumanMessage
+
+load_dotenv()
+
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "10"))
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "4000"))
+CHAT_HISTORY_SUMMARY = os.getenv("CHAT_HISTORY_SUMMARY", "false").lower() in ("1", "true", "yes")
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 3
+
+history_stats = {
+    "llm_calls": 0,
+    "tokens_sent_total": 0,
+    "tokens_sent_last": 0,
+    "tokens_sent_max": 0,
+    "messages_trimmed": 0,
+    "summaries": 0,
+}
+
+
+def approx_tokens(messages: list[BaseMessage]) -> int:
+    # Грубая оценка без обращения к токенизатору GigaChat: ~4 символа на токен
+    total = 0
+    for message in messages:
+        total += len(str(message.content)) // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE
+        for call in getattr(message, "tool_calls", None) or []:
+            total += len(str(call.get("args", ""))) // CHARS_PER_TOKEN
+    return total
+
+
+def split_turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+    """Делит историю на ходы, каждый начинается с сообщения пользователя.
+
+    Ход целиком содержит вызовы инструментов и их результаты, поэтому отбрасывание
+    ходов не оставляет ToolMessage без породившего его вызова.
+    """
+    turns: list[list[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def select_history(
+    messages: list[BaseMessage],
+    *,
+    max_turns: int = CHAT_HISTORY_MAX_TURNS,
+    max_tokens: int = CHAT_HISTORY_MAX_TOKENS,
+) -> tuple[list[BaseMessage], list[BaseMessage]]:
+    """Возвращает (отправляемые сообщения, отброшенные сообщения).
+
+    Текущий ход отправляется всегда, даже если сам превышает бюджет.
+    """
+    turns = split_turns(messages)
+    kept = turns[-max(max_turns, 1):]
+    dropped_turns = turns[:len(turns) - len(kept)]
+
+    budget = sum(approx_tokens(turn) for turn in kept)
+    while len(kept) > 1 and budget > max_tokens:
+        oldest = kept.pop(0)
+        budget -= approx_tokens(oldest)
+        dropped_turns.append(oldest)
+
+    sent = [message for turn in kept for message in turn]
+    dropped = [message for turn in dropped_turns for message in turn]
+    return sent, dropped
+
+
+def record_call(tokens: int, trimmed: int) -> None:
+    history_stats["llm_calls"] += 1
+    history_stats["tokens_sent_total"] += tokens
+    history_stats["tokens_sent_last"] = tokens
+    history_stats["tokens_sent_max"] = max(history_stats["tokens_sent_max"], tokens)
+    history_stats["messages_trimmed"] += trimmed
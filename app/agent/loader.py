@@ -0,0 +1,50 @@
+import asyncio
+import importlib
+import os
+from types import ModuleType
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# false — воркер обслуживает только CRUD, LangChain/GigaChat не импортируются вовсе
+AGENT_ENABLED = os.getenv("AGENT_ENABLED", "true").lower() in ("1", "true", "yes")
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "false").lower() in ("1", "true", "yes")
+
+SERVICE_MODULE = "app.agent.service"
+
+
+_agent: ModuleType | None = None
+_loading: asyncio.Task | None = None
+
+
+def agent_loaded() -> bool:
+    # модуль появляется в sys.modules в начале импорта, поэтому смотрим на свой флаг
+    return _agent is not None
+
+
+async def _import_agent() -> ModuleType:
+    global _agent, _loading
+    try:
+        module = await asyncio.to_thread(importlib.import_module, SERVICE_MODULE)
+    except BaseException:
+        # неудачный импорт не запоминаем: следующее обращение попробует снова
+        _loading = None
+        raise
+    _agent = module
+    return module
+
+
+async def load_agent() -> ModuleType:
+    """Импортирует агента при первом обращении.
+
+    Импорт идёт в отдельном потоке, чтобы event loop продолжал обслуживать CRUD-запросы;
+    все одновременные обращения ждут одну и ту же задачу импорта.
+    """
+    global _loading
+    if _agent is not None:
+        return _agent
+    if _loading is None:
+        _loading = asyncio.create_task(_import_agent())
+    # shield: отмена одного запроса не должна обрывать общий импорт
+    return await asyncio.shield(_loading)
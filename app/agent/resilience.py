@@ -0,0 +1,237 @@
+import asyncio
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+from gigachat.exceptions import AuthenticationError, ResponseError
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+load_dotenv()
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+T = TypeVar("T")
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMOverloaded(LLMError):
+    """Очередь к GigaChat переполнена (429)."""
+
+
+class LLMUnavailable(LLMError):
+    """GigaChat не отвечает или размыкатель открыт (503)."""
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, ResponseError) and not isinstance(error, AuthenticationError):
+        status = error.args[1] if len(error.args) > 1 else None
+        return status == 429 or (isinstance(status, int) and status >= 500)
+    return False
+
+
+class LLMGuard:
+    """Таймаут, повторы с джиттером, ограничение параллелизма и размыкатель для вызовов LLM.
+
+    Рассчитан на один event loop, как и кэши в ``app/cache.py``.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        failure_threshold: int = LLM_BREAKER_THRESHOLD,
+        reset_timeout: float = LLM_BREAKER_RESET_SECONDS,
+    ) -> None:
+        self.timeout = timeout
+        self.max_retries = max(max_retries, 0)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max(max_queue, 0)
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pending = 0
+        self._in_flight = 0
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self.counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "failed": 0,
+            "interrupted": 0,
+            "rejected_overloaded": 0,
+            "rejected_open": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def _acquire_breaker(self) -> bool:
+        """Пропускает вызов через размыкатель; True — это пробный вызов в полуоткрытом состоянии."""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        self.counters["rejected_open"] += 1
+        retry_after = self.reset_timeout - (time.monotonic() - self._opened_at) if state == "open" else 1.0
+        raise LLMUnavailable("GigaChat временно недоступен, попробуйте позже", max(retry_after, 1.0))
+
+    def _record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def _record_failure(self, probe: bool) -> None:
+        self._failures += 1
+        if probe or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[T]],
+        *,
+        retryable: Callable[[], bool] | None = None,
+    ) -> T:
+        """``retryable`` вызывается после временной ошибки; False — повтор запрещён."""
+        if self._pending >= self.max_concurrency + self.max_queue:
+            self.counters["rejected_overloaded"] += 1
+            raise LLMOverloaded("Слишком много одновременных запросов к агенту, попробуйте позже", 1.0)
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    return await self._call_with_retries(func, retryable)
+                finally:
+                    self._in_flight -= 1
+        finally:
+            self._pending -= 1
+
+    async def _call_with_retries(
+        self,
+        func: Callable[[], Awaitable[T]],
+        retryable: Callable[[], bool] | None,
+    ) -> T:
+        attempt = 0
+        while True:
+            probe = self._acquire_breaker()
+            self.counters["calls"] += 1
+            try:
+                result = await asyncio.wait_for(func(), self.timeout)
+            except Exception as e:
+                if not is_transient(e):
+                    self.counters["failed"] += 1
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self.counters["timeouts"] += 1
+                self._record_failure(probe)
+                if retryable is not None and not retryable():
+                    self.counters["interrupted"] += 1
+                    raise LLMUnavailable("GigaChat прервал ответ, попробуйте ещё раз", 1.0) from e
+                if attempt >= self.max_retries:
+                    self.counters["failed"] += 1
+                    raise LLMUnavailable(
+                        f"GigaChat не ответил после {attempt + 1} попыток", self.reset_timeout
+                    ) from e
+                self.counters["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            finally:
+                # и при отмене пробного вызова (клиент отключился), иначе размыкатель
+                # навсегда останется полуоткрытым с занятой пробой
+                if probe:
+                    self._probing = False
+
+            self._record_success()
+            self.counters["succeeded"] += 1
+            return result
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "state": self.state,
+            "in_flight": self._in_flight,
+            "queued": self._pending - self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+llm_guard = LLMGuard()
+
+
+class _TokenWatcher(BaseCallbackHandler):
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.streamed = True
+
+
+def _with_handler(config: RunnableConfig, handler: BaseCallbackHandler) -> RunnableConfig:
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = [*(callbacks or []), handler]
+    return {**config, "callbacks": callbacks}
+
+
+def guarded(runnable: Runnable, guard: LLMGuard = llm_guard) -> Runnable:
+    """Оборачивает модель так, чтобы каждый вызов шёл через ``guard``; колбэки стриминга сохраняются.
+
+    Повтор возможен только до первого токена: токены неудачной попытки уже ушли клиенту
+    в ``/chat/stream``, и повтор показал бы ответ дважды.
+    """
+
+    async def call(input: Any, config: RunnableConfig) -> Any:
+        watcher = _TokenWatcher()
+        watched = _with_handler(config, watcher)
+        return await guard.call(
+            lambda: runnable.ainvoke(input, watched), retryable=lambda: not watcher.streamed
+        )
+
+    return RunnableLambda(call, name=f"guarded_{runnable.get_name()}")
@@ -0,0 +1,58 @@
+import re
+from collections.abc import Hashable
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
+
+from ..cache import CHAT_CACHE_ENABLED, MISSING, chat_response_cache
+from ..crud import get_catalog_version
+from ..db.session import AsyncSessionLocal
+from .graph import checkpointer, record_exchange
+from .tools import read_only_tools
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    return _SPACES.sub(" ", text).strip().rstrip("?!.").strip().lower()
+
+
+def is_read_only(messages: list[BaseMessage]) -> bool:
+    return all(
+        call["name"] in read_only_tools
+        for message in messages
+        if isinstance(message, AIMessage)
+        for call in message.tool_calls
+    )
+
+
+async def cached_response(
+    text: str,
+    config: RunnableConfig,
+    *,
+    new_thread: bool,
+) -> tuple[Hashable | None, str | None]:
+    """Возвращает (ключ кэша, сохранённый ответ).
+
+    Кэш применяется только к первому сообщению потока: ответ в середине беседы
+    зависит от контекста. Ключ ``None`` означает, что ответ кэшировать нельзя.
+    """
+    if not CHAT_CACHE_ENABLED:
+        return None, None
+    if not new_thread and await checkpointer.aget_tuple(config) is not None:
+        return None, None
+
+    # версия читается из базы: запись в другом воркере тоже меняет ключ
+    async with AsyncSessionLocal() as db:
+        version = await get_catalog_version(db)
+    key = (normalize_prompt(text), version)
+    response = chat_response_cache.get(key)
+    if response is MISSING:
+        return key, None
+    await record_exchange(config, text, response)
+    return key, response
+
+
+def remember_response(key: Hashable | None, messages: list[BaseMessage], response: str) -> None:
+    if key is not None and response and is_read_only(messages):
+        chat_response_cache.set(key, response)
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+
+from dotenv import load_dotenv
+
+from .tools import (
+    delete_category_tool,
+    delete_product_tool,
+    get_category_details_tool,
+    get_product_details_tool,
+    restore_category_tool,
+)
+
+load_dotenv()
+
+CHAT_FAST_PATH = os.getenv("CHAT_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+router_stats = {
+    "requests": 0,
+    "fast_path": 0,
+}
+
+_VERBS = {
+    "get": r"покажи|получи|найди|выведи|get|show",
+    "delete": r"удали|удалить|delete|remove",
+    "restore": r"восстанови|восстановить|restore",
+}
+_ENTITIES = {
+    "product": r"продукт[аы]?|товар[аы]?|product",
+    "category": r"категори[юяи]|category",
+}
+
+COMMAND_PATTERN = re.compile(
+    rf"^(?P<verb>{'|'.join(f'(?P<{name}>{verbs})' for name, verbs in _VERBS.items())})\s+"
+    rf"(?P<entity>{'|'.join(f'(?P<{name}>{entity})' for name, entity in _ENTITIES.items())})\s+"
+    r"(?:(?:с\s+)?(?:id|ид)\s*|№\s*|#\s*)?(?P<id>\d+)[.!]?$",
+    re.IGNORECASE,
+)
+
+
+def _product_reply(data: dict) -> str:
+    reply = f"Продукт «{data['name']}» (ID {data['id']}): цена {data['price']}, категория {data['category_id']}."
+    if data.get("description"):
+        reply += f" {data['description']}"
+    return reply
+
+
+def _category_reply(data: dict) -> str:
+    reply = f"Категория «{data['name']}» (ID {data['id']})."
+    if data.get("description"):
+        reply += f" {data['description']}"
+    return reply
+
+
+COMMANDS = {
+    ("get", "product"): (get_product_details_tool, _product_reply),
+    ("get", "category"): (get_category_details_tool, _category_reply),
+    ("delete", "product"): (
+        delete_product_tool,
+        lambda data: f"Продукт «{data['name']}» (ID {data['id']}) удалён.",
+    ),
+    ("delete", "category"): (
+        delete_category_tool,
+        lambda data: (
+            f"Категория «{data['name']}» (ID {data['id']}) удалена, "
+            f"вместе с ней удалено продуктов: {data['deleted_products']}."
+        ),
+    ),
+    ("restore", "category"): (
+        restore_category_tool,
+        lambda data: (
+            f"Категория «{data['name']}» (ID {data['id']}) восстановлена, "
+            f"восстановлено продуктов: {data['restored_products']}."
+        ),
+    ),
+}
+
+
+def parse_command(text: str) -> tuple[str, str, int] | None:
+    match = COMMAND_PATTERN.match(text.strip())
+    if not match:
+        return None
+    verb = next(name for name in _VERBS if match.group(name))
+    entity = next(name for name in _ENTITIES if match.group(name))
+    if (verb, entity) not in COMMANDS:
+        return None
+    return verb, entity, int(match.group("id"))
+
+
+async def route_command(text: str) -> str | None:
+    """Выполняет однозначную команду без GigaChat и возвращает готовый ответ.
+
+    ``None`` — сообщение не распознано и должно уйти агенту.
+    """
+    router_stats["requests"] += 1
+    command = parse_command(text) if CHAT_FAST_PATH else None
+    if command is None:
+        return None
+
+    verb, entity, object_id = command
+    tool, reply = COMMANDS[(verb, entity)]
+    result = json.loads(await tool(object_id))
+    router_stats["fast_path"] += 1
+    if not result["success"]:
+        return result["error"]
+    return reply(result["data"])
@@ -0,0 +1,130 @@
+"""Обработка сообщений чата; модуль тяжёлый и загружается лениво через ``app.agent.loader``."""
+import json
+import math
+import uuid
+
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+
+from ..schemas import ChatMessage, ChatResponse
+from .graph import app as agent_app, checkpointer, record_exchange
+from .history import history_stats
+from .response_cache import cached_response, remember_response
+from .resilience import LLMError, LLMOverloaded, llm_guard
+from .router import route_command, router_stats
+
+
+def _llm_error_status(error: LLMError) -> int:
+    return 429 if isinstance(error, LLMOverloaded) else 503
+
+
+async def chat(message: ChatMessage) -> ChatResponse:
+    thread_id = message.thread_id or str(uuid.uuid4())
+
+    config = {"configurable": {"thread_id": thread_id}}
+
+    human_message = HumanMessage(content=message.message)
+
+    try:
+        routed = await route_command(message.message)
+        if routed is not None:
+            await record_exchange(config, message.message, routed)
+            return ChatResponse(response=routed, thread_id=thread_id)
+
+        cache_key, cached = await cached_response(
+            message.message, config, new_thread=message.thread_id is None
+        )
+        if cached is not None:
+            return ChatResponse(response=cached, thread_id=thread_id)
+
+        result = await agent_app.ainvoke(
+            {"messages": [human_message]},
+            config=config
+        )
+
+        last_message = result["messages"][-1]
+        response_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
+        remember_response(cache_key, result["messages"], response_text)
+
+        return ChatResponse(response=response_text, thread_id=thread_id)
+
+    except LLMError as e:
+        raise HTTPException(
+            status_code=_llm_error_status(e),
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка агента: {str(e)}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def chat_events(message: ChatMessage, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    yield _sse("thread", {"thread_id": thread_id})
+
+    response_text = ""
+    ai_messages = []
+    try:
+        routed = await route_command(message.message)
+        if routed is not None:
+            await record_exchange(config, message.message, routed)
+            yield _sse("token", {"content": routed})
+            yield _sse("done", {"response": routed, "thread_id": thread_id})
+            return
+
+        cache_key, cached = await cached_response(
+            message.message, config, new_thread=message.thread_id is None
+        )
+        if cached is not None:
+            yield _sse("token", {"content": cached})
+            yield _sse("done", {"response": cached, "thread_id": thread_id})
+            return
+
+        async for mode, payload in agent_app.astream(
+            {"messages": [HumanMessage(content=message.message)]},
+            config=config,
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                if isinstance(chunk, AIMessageChunk) and chunk.content and metadata.get("langgraph_node") == "agent":
+                    yield _sse("token", {"content": chunk.content})
+                continue
+
+            for update in payload.values():
+                for msg in (update or {}).get("messages", []):
+                    if isinstance(msg, ToolMessage):
+                        yield _sse("tool_result", {
+                            "name": msg.name,
+                            "tool_call_id": msg.tool_call_id,
+                            "content": msg.content,
+                        })
+                    elif isinstance(msg, AIMessage):
+                        ai_messages.append(msg)
+                        for call in msg.tool_calls:
+                            yield _sse("tool_call", {"name": call["name"], "args": call["args"], "id": call["id"]})
+                        if not msg.tool_calls:
+                            response_text = msg.content
+
+        remember_response(cache_key, ai_messages, response_text)
+        yield _sse("done", {"response": response_text, "thread_id": thread_id})
+    except LLMError as e:
+        yield _sse("error", {
+            "detail": str(e),
+            "status": _llm_error_status(e),
+            "retry_after": math.ceil(e.retry_after),
+        })
+    except Exception as e:
+        yield _sse("error", {"detail": f"Ошибка агента: {str(e)}"})
+
+
+def chat_stats() -> dict:
+    return {**history_stats, "router": router_stats, "llm": llm_guard.stats()}
+
+
+async def delete_thread(thread_id: str) -> None:
+    await checkpointer.adelete_thread(thread_id)
@@ -1,5 +1,8 @@
-import json
+from typing import Any
+
+import orjson
 from langchain_core.tools import StructuredTool
+from pydantic import BaseModel
 
 from .llm import llm
 from ..db.session import AsyncSessionLocal
@@ -12,23 +15,83 @@ from ..crud import (
     update_category,
     update_product,
     delete_category,
+    restore_category,
     delete_product,
+    create_categories_bulk,
+    update_categories_bulk,
+    create_products_bulk,
+    update_products_bulk,
+    delete_products_bulk,
+    get_categories_by_names,
+    get_products_by_ids,
+    get_category_stats,
 )
 from ..schemas import (
+    BULK_MAX_ITEMS,
     CategoryCreate,
     ProductCreate,
     CategoryUpdate,
     ProductUpdate,
+    CategoryBulkUpdateItem,
+    ProductBulkUpdateItem,
 )
 
 
-def tool_response(success: bool, *, data: dict | None = None, error: str | None = None) -> str:
+def tool_result(success: bool, *, data: dict | None = None, error: str | None = None) -> dict:
     payload: dict[str, object] = {"success": success}
     if data is not None:
         payload["data"] = data
     if error:
         payload["error"] = error
-    return json.dumps(payload, ensure_ascii=False)
+    return payload
+
+
+def tool_response(success: bool, *, data: dict | None = None, error: str | None = None) -> str:
+    return orjson.dumps(tool_result(success, data=data, error=error)).decode()
+
+
+def batch_response(results: list[dict]) -> str:
+    failed = sum(not result["success"] for result in results)
+    return tool_response(
+        failed == 0,
+        data={"succeeded": len(results) - failed, "failed": failed, "results": results},
+        error=f"Не выполнено операций: {failed} из {len(results)}" if failed else None,
+    )
+
+
+def validation_error(error: Exception) -> str:
+    return tool_response(False, error=f"Некорректные аргументы: {str(error)}")
+
+
+class _Unset:
+    """Аргумент не передан моделью; явный null означает «очистить поле»."""
+
+    def __repr__(self) -> str:
+        return "UNSET"
+
+
+UNSET: Any = _Unset()
+
+
+def provided(**fields) -> dict:
+    # Неуказанные аргументы в обновление не попадают, явный None попадает и очищает поле
+    return {field: value for field, value in fields.items() if value is not UNSET}
+
+
+class UpdateCategoryArgs(BaseModel):
+    # Схема аргументов задана явно: в функции по умолчанию UNSET, а StructuredTool передаёт
+    # только аргументы, присланные моделью
+    category_id: int
+    name: str | None = None
+    description: str | None = None
+
+
+class UpdateProductArgs(BaseModel):
+    product_id: int
+    name: str | None = None
+    description: str | None = None
+    price: float | None = None
+    category_id: int | None = None
 
 
 def serialize_category(category) -> dict:
@@ -83,14 +146,15 @@ async def create_product_tool(
 
 async def update_category_tool(
     category_id: int,
-    name: str | None = None,
-    description: str | None = None
+    name: str | None = UNSET,
+    description: str | None = UNSET
 ) -> str:
-    if name is None and description is None:
+    fields = provided(name=name, description=description)
+    if not fields:
         return tool_response(False, error="Нужно указать хотя бы одно поле для обновления категории")
     async with AsyncSessionLocal() as db:
         try:
-            payload = CategoryUpdate(name=name, description=description)
+            payload = CategoryUpdate(**fields)
             category = await update_category(db, category_id, payload)
             return tool_response(True, data=serialize_category(category))
         except ValueError as e:
@@ -102,14 +166,29 @@ async def update_category_tool(
 async def delete_category_tool(category_id: int) -> str:
     async with AsyncSessionLocal() as db:
         try:
-            category = await delete_category(db, category_id)
-            return tool_response(True, data=serialize_category(category))
+            category, deleted_products = await delete_category(db, category_id)
+            data = serialize_category(category)
+            data["deleted_products"] = deleted_products
+            return tool_response(True, data=data)
         except ValueError as e:
             return tool_response(False, error=str(e))
         except Exception as e:
             return tool_response(False, error=f"Ошибка при удалении категории: {str(e)}")
 
 
+async def restore_category_tool(category_id: int) -> str:
+    async with AsyncSessionLocal() as db:
+        try:
+            category, restored_products = await restore_category(db, category_id)
+            data = serialize_category(category)
+            data["restored_products"] = restored_products
+            return tool_response(True, data=data)
+        except ValueError as e:
+            return tool_response(False, error=str(e))
+        except Exception as e:
+            return tool_response(False, error=f"Ошибка при восстановлении категории: {str(e)}")
+
+
 async def get_category_id_by_name_tool(name: str) -> str:
     async with AsyncSessionLocal() as db:
         try:
@@ -132,23 +211,30 @@ async def get_category_details_tool(category_id: int) -> str:
             return tool_response(False, error=f"Ошибка при получении категории: {str(e)}")
 
 
+async def get_category_stats_tool(category_id: int) -> str:
+    async with AsyncSessionLocal() as db:
+        try:
+            stats = await get_category_stats(db, category_id)
+            if not stats:
+                return tool_response(False, error=f"Категория с ID {category_id} не найдена")
+            return tool_response(True, data=stats)
+        except Exception as e:
+            return tool_response(False, error=f"Ошибка при получении статистики категории: {str(e)}")
+
+
 async def update_product_tool(
     product_id: int,
-    name: str | None = None,
-    description: str | None = None,
-    price: float | None = None,
-    category_id: int | None = None
+    name: str | None = UNSET,
+    description: str | None = UNSET,
+    price: float | None = UNSET,
+    category_id: int | None = UNSET
 ) -> str:
-    if all(value is None for value in [name, description, price, category_id]):
+    fields = provided(name=name, description=description, price=price, category_id=category_id)
+    if not fields:
         return tool_response(False, error="Нужно указать хотя бы одно поле для обновления продукта")
     async with AsyncSessionLocal() as db:
         try:
-            payload = ProductUpdate(
-                name=name,
-                description=description,
-                price=price,
-                category_id=category_id
-            )
+            payload = ProductUpdate(**fields)
             product = await update_product(db, product_id, payload)
             return tool_response(True, data=serialize_product(product))
         except ValueError as e:
@@ -179,6 +265,152 @@ async def get_product_details_tool(product_id: int) -> str:
             return tool_response(False, error=f"Ошибка при получении продукта: {str(e)}")
 
 
+async def _run_batch(items: list[dict], build, write, serialize, error_prefix: str = "") -> list[dict]:
+    """Выполняет однотипные операции одной транзакцией и возвращает результат для каждой.
+
+    Ошибки валидации и «не найдено» остаются ошибками отдельных элементов.
+    """
+    results: list[dict | None] = [None] * len(items)
+    payloads, positions = [], []
+    for position, item in enumerate(items):
+        try:
+            payloads.append(build(item))
+            positions.append(position)
+        except Exception as e:
+            results[position] = tool_result(False, error=f"{error_prefix}{str(e)}")
+
+    if payloads:
+        async with AsyncSessionLocal() as db:
+            try:
+                outcomes = await write(db, payloads)
+            except Exception as e:
+                outcomes = [(None, str(e))] * len(payloads)
+        for position, (obj, error) in zip(positions, outcomes):
+            if obj is None:
+                results[position] = tool_result(False, error=f"{error_prefix}{error}")
+            else:
+                results[position] = tool_result(True, data=serialize(obj))
+    return results
+
+
+async def create_categories_batch(items: list[dict]) -> list[dict]:
+    async def write(db, payloads):
+        return [(category, None) for category in await create_categories_bulk(db, payloads)]
+
+    return await _run_batch(
+        items,
+        lambda item: CategoryCreate(**item),
+        write,
+        serialize_category,
+        "Ошибка при создании категории: ",
+    )
+
+
+def _category_update_item(item: dict) -> CategoryBulkUpdateItem:
+    fields = dict(item)
+    category_id = fields.pop("category_id")
+    if not provided(**fields):
+        raise ValueError("Нужно указать хотя бы одно поле для обновления категории")
+    return CategoryBulkUpdateItem(id=category_id, **provided(**fields))
+
+
+def _product_update_item(item: dict) -> ProductBulkUpdateItem:
+    fields = dict(item)
+    product_id = fields.pop("product_id")
+    if not provided(**fields):
+        raise ValueError("Нужно указать хотя бы одно поле для обновления продукта")
+    return ProductBulkUpdateItem(id=product_id, **provided(**fields))
+
+
+async def update_categories_batch(items: list[dict]) -> list[dict]:
+    return await _run_batch(
+        items,
+        _category_update_item,
+        update_categories_bulk,
+        serialize_category,
+    )
+
+
+async def create_products_batch(items: list[dict]) -> list[dict]:
+    return await _run_batch(
+        items,
+        lambda item: ProductCreate(**item),
+        create_products_bulk,
+        serialize_product,
+        "Ошибка при создании продукта: ",
+    )
+
+
+async def update_products_batch(items: list[dict]) -> list[dict]:
+    return await _run_batch(
+        items,
+        _product_update_item,
+        update_products_bulk,
+        serialize_product,
+    )
+
+
+async def delete_products_batch(items: list[dict]) -> list[dict]:
+    return await _run_batch(
+        items,
+        lambda item: item["product_id"],
+        delete_products_bulk,
+        serialize_product,
+    )
+
+
+def _too_many(items: list) -> str | None:
+    if len(items) > BULK_MAX_ITEMS:
+        return tool_response(False, error=f"За один вызов можно обработать не больше {BULK_MAX_ITEMS} элементов")
+    return None
+
+
+async def create_products_tool(products: list[ProductCreate]) -> str:
+    if error := _too_many(products):
+        return error
+    return batch_response(await create_products_batch([product.model_dump() for product in products]))
+
+
+async def update_products_tool(products: list[ProductBulkUpdateItem]) -> str:
+    if error := _too_many(products):
+        return error
+    items = [
+        {"product_id": item.id, **item.model_dump(exclude={"id"}, exclude_unset=True)}
+        for item in products
+    ]
+    return batch_response(await update_products_batch(items))
+
+
+async def get_categories_by_names_tool(names: list[str]) -> str:
+    if error := _too_many(names):
+        return error
+    async with AsyncSessionLocal() as db:
+        try:
+            found = await get_categories_by_names(db, names)
+        except Exception as e:
+            return tool_response(False, error=f"Ошибка при поиске категорий: {str(e)}")
+    return batch_response([
+        tool_result(True, data=serialize_category(found[name])) if name in found
+        else tool_result(False, error=f"Категория '{name}' не найдена")
+        for name in names
+    ])
+
+
+async def get_products_tool(product_ids: list[int]) -> str:
+    if error := _too_many(product_ids):
+        return error
+    async with AsyncSessionLocal() as db:
+        try:
+            found = await get_products_by_ids(db, product_ids)
+        except Exception as e:
+            return tool_response(False, error=f"Ошибка при получении продуктов: {str(e)}")
+    return batch_response([
+        tool_result(True, data=serialize_product(found[product_id])) if product_id in found
+        else tool_result(False, error=f"Продукт с ID {product_id} не найден")
+        for product_id in product_ids
+    ])
+
+
 create_category_tool_langchain = StructuredTool.from_function(
     name="create_category",
     description=(
@@ -209,8 +441,12 @@ get_category_id_tool_langchain = StructuredTool.from_function(
 
 update_category_tool_langchain = StructuredTool.from_function(
     name="update_category",
-    description="Обновляет существующую категорию по ID.",
+    description=(
+        "Обновляет существующую категорию по ID. Передавай только изменяемые поля; "
+        "description: null очищает описание."
+    ),
     coroutine=update_category_tool,
+    args_schema=UpdateCategoryArgs,
 )
 
 delete_category_tool_langchain = StructuredTool.from_function(
@@ -219,16 +455,35 @@ delete_category_tool_langchain = StructuredTool.from_function(
     coroutine=delete_category_tool,
 )
 
+restore_category_tool_langchain = StructuredTool.from_function(
+    name="restore_category",
+    description="Восстанавливает мягко удалённую категорию вместе с её продуктами.",
+    coroutine=restore_category_tool,
+)
+
 get_category_details_tool_langchain = StructuredTool.from_function(
     name="get_category",
     description="Возвращает данные категории по ID.",
     coroutine=get_category_details_tool,
 )
 
+get_category_stats_tool_langchain = StructuredTool.from_function(
+    name="get_category_stats",
+    description=(
+        "Возвращает статистику категории по ID: число товаров, минимальную, максимальную "
+        "и среднюю цену. Не требует получения списка товаров."
+    ),
+    coroutine=get_category_stats_tool,
+)
+
 update_product_tool_langchain = StructuredTool.from_function(
     name="update_product",
-    description="Обновляет существующий продукт по ID.",
+    description=(
+        "Обновляет существующий продукт по ID. Передавай только изменяемые поля; "
+        "description: null очищает описание."
+    ),
     coroutine=update_product_tool,
+    args_schema=UpdateProductArgs,
 )
 
 delete_product_tool_langchain = StructuredTool.from_function(
@@ -243,16 +498,77 @@ get_product_details_tool_langchain = StructuredTool.from_function(
     coroutine=get_product_details_tool,
 )
 
+create_products_tool_langchain = StructuredTool.from_function(
+    name="create_products",
+    description=(
+        "Создает сразу несколько продуктов одной операцией. Используй вместо create_product, "
+        "когда нужно добавить больше одного товара. Результаты возвращаются в порядке списка."
+    ),
+    coroutine=create_products_tool,
+    handle_validation_error=validation_error,
+)
+
+update_products_tool_langchain = StructuredTool.from_function(
+    name="update_products",
+    description=(
+        "Обновляет сразу несколько продуктов по ID одной операцией. У каждого элемента "
+        "указывай id и только изменяемые поля."
+    ),
+    coroutine=update_products_tool,
+    handle_validation_error=validation_error,
+)
+
+get_categories_by_names_tool_langchain = StructuredTool.from_function(
+    name="get_categories_by_names",
+    description=(
+        "Находит несколько категорий по названиям за один вызов. Используй вместо "
+        "повторных вызовов get_category_id_by_name."
+    ),
+    coroutine=get_categories_by_names_tool,
+    handle_validation_error=validation_error,
+)
+
+get_products_tool_langchain = StructuredTool.from_function(
+    name="get_products",
+    description="Возвращает данные нескольких продуктов по списку ID за один вызов.",
+    coroutine=get_products_tool,
+    handle_validation_error=validation_error,
+)
+
 tools = [
     create_category_tool_langchain,
     create_product_tool_langchain,
     get_category_id_tool_langchain,
     update_category_tool_langchain,
     delete_category_tool_langchain,
+    restore_category_tool_langchain,
     get_category_details_tool_langchain,
+    get_category_stats_tool_langchain,
     update_product_tool_langchain,
     delete_product_tool_langchain,
     get_product_details_tool_langchain,
+    create_products_tool_langchain,
+    update_products_tool_langchain,
+    get_categories_by_names_tool_langchain,
+    get_products_tool_langchain,
 ]
 
+# Несколько вызовов одного инструмента за шаг агента выполняются одной транзакцией
+batch_runners = {
+    "create_category": create_categories_batch,
+    "update_category": update_categories_batch,
+    "create_product": create_products_batch,
+    "update_product": update_products_batch,
+    "delete_product": delete_products_batch,
+}
+
+read_only_tools = {
+    "get_category_id_by_name",
+    "get_category",
+    "get_category_stats",
+    "get_product",
+    "get_categories_by_names",
+    "get_products",
+}
+
 llm_with_tools = llm.bind_tools(tools)
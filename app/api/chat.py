@@ -0,0 +1,42 @@
+import uuid
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from ..agent.loader import load_agent
+from ..schemas import ChatMessage, ChatResponse
+
+chat_router = APIRouter(prefix="/chat", tags=["chat"])
+
+
+@chat_router.post("", response_model=ChatResponse)
+async def chat_endpoint(
+    message: ChatMessage,
+):
+    service = await load_agent()
+    return await service.chat(message)
+
+
+@chat_router.post("/stream")
+async def chat_stream_endpoint(
+    message: ChatMessage,
+):
+    service = await load_agent()
+    thread_id = message.thread_id or str(uuid.uuid4())
+    return StreamingResponse(
+        service.chat_events(message, thread_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@chat_router.get("/stats")
+async def chat_stats_endpoint():
+    service = await load_agent()
+    return service.chat_stats()
+
+
+@chat_router.delete("/{thread_id}", status_code=204)
+async def delete_chat_thread(thread_id: str):
+    service = await load_agent()
+    await service.delete_thread(thread_id)
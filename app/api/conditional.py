@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+from fastapi import Request, Response
+
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, no-cache")
+
+
+def entity_etag(kind: str, obj) -> str:
+    return f'"{kind}-{obj.id}-v{obj.version}"'
+
+
+def list_etag(kind: str, rows: list[dict]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update(f"{row['id']}:{row['version']};".encode())
+    return f'"{kind}-list-{digest.hexdigest()}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Для If-None-Match используется слабое сравнение (RFC 9110, 13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional(request: Request, response: Response, etag: str) -> Response | None:
+    """Ставит ETag и Cache-Control; если клиентская копия актуальна — возвращает готовый 304."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+import math
+from typing import Literal
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.session import get_db
+from .conditional import conditional, entity_etag, list_etag
+from ..export import EXPORT_MEDIA_TYPES, export_rows
+from ..pagination import next_cursor
+from ..write_queue import WRITE_QUEUE_ENABLED, WriteQueueFull, product_write_queue
 from ..schemas import (
+    BULK_MAX_ITEMS,
     ProductCreate,
     ProductResponse,
     ProductUpdate,
+    ProductBulkUpdateItem,
+    ProductBulkResult,
     CategoryCreate,
     CategoryResponse,
+    CategoryDeleteResponse,
+    CategoryRestoreResponse,
+    CategoryStatsResponse,
     CategoryUpdate,
+    CategoryBulkUpdateItem,
+    CategoryBulkResult,
+    BulkDeleteRequest,
 )
 from ..crud import (
     create_product,
@@ -21,6 +38,20 @@ from ..crud import (
     get_category,
     update_category,
     delete_category,
+    restore_category,
+    stream_categories,
+    stream_products,
+    CATEGORY_EXPORT_COLUMNS,
+    PRODUCT_EXPORT_COLUMNS,
+    search_products,
+    get_category_stats,
+    get_all_category_stats,
+    create_categories_bulk,
+    update_categories_bulk,
+    delete_categories_bulk,
+    create_products_bulk,
+    update_products_bulk,
+    delete_products_bulk,
 )
 
 product_router = APIRouter(prefix="/products", tags=["products"])
@@ -41,24 +72,158 @@ async def create_product_endpoint(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _rows_response(rows: list[dict], response: Response) -> ORJSONResponse:
+    # Строки уже выбраны по полям схемы ответа: без повторной валидации и jsonable_encoder,
+    # response_model остаётся только для документации
+    return ORJSONResponse(rows, headers=dict(response.headers))
+
+ProductSort = Literal["id", "-id", "name", "-name", "price", "-price"]
+CategorySort = Literal["id", "-id", "name", "-name"]
+
+
+def _product_results(outcomes) -> list[ProductBulkResult]:
+    return [
+        ProductBulkResult(
+            index=index,
+            success=product is not None,
+            data=ProductResponse.model_validate(product) if product is not None else None,
+            error=error,
+        )
+        for index, (product, error) in enumerate(outcomes)
+    ]
+
+
+def _category_results(outcomes) -> list[CategoryBulkResult]:
+    return [
+        CategoryBulkResult(
+            index=index,
+            success=category is not None,
+            data=CategoryResponse.model_validate(category) if category is not None else None,
+            error=error,
+        )
+        for index, (category, error) in enumerate(outcomes)
+    ]
+
+
+@product_router.post("/bulk", response_model=list[ProductBulkResult])
+async def create_products_bulk_endpoint(
+    products: list[ProductCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_db)
+):
+    return _product_results(await create_products_bulk(db, products))
+
+
+@product_router.patch("/bulk", response_model=list[ProductBulkResult])
+async def update_products_bulk_endpoint(
+    items: list[ProductBulkUpdateItem] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_db)
+):
+    return _product_results(await update_products_bulk(db, items))
+
+
+@product_router.post("/bulk/delete", response_model=list[ProductBulkResult])
+async def delete_products_bulk_endpoint(
+    request: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    return _product_results(await delete_products_bulk(db, request.ids))
+
+
 @product_router.get("/", response_model=list[ProductResponse])
 async def list_products(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    sort: ProductSort = Query("id", description="Поле сортировки, «-» — по убыванию"),
+    category_id: int | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    include_deleted: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
-    products = await get_all_products(db, skip=skip, limit=limit)
-    return [ProductResponse.model_validate(prod) for prod in products]
+    return await _product_page(
+        request,
+        response,
+        db,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        include_deleted=include_deleted,
+    )
+
+
+async def _product_page(request: Request, response: Response, db: AsyncSession, **params):
+    try:
+        products = await get_all_products(db, **params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    token = next_cursor(products, params["sort"], params["limit"])
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    if not_modified := conditional(request, response, list_etag("products", products)):
+        return not_modified
+    return _rows_response(products, response)
+
+
+@product_router.get("/search", response_model=list[ProductResponse])
+async def search_products_endpoint(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос по названию и описанию"),
+    category_id: int | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    products = await search_products(
+        db,
+        q,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        limit=limit,
+    )
+    return _rows_response(products, response)
+
+
+@product_router.get("/export")
+async def export_products(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    include_deleted: bool = False,
+):
+    columns = [column.name for column in PRODUCT_EXPORT_COLUMNS]
+    return StreamingResponse(
+        export_rows(
+            lambda db: stream_products(db, include_deleted=include_deleted),
+            columns,
+            format,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
 
 
 @product_router.get("/{product_id}", response_model=ProductResponse)
 async def get_product_endpoint(
     product_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
     product = await get_product(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Продукт не найден")
+    if not_modified := conditional(request, response, entity_etag("product", product)):
+        return not_modified
     return ProductResponse.model_validate(product)
 
 
@@ -68,11 +233,19 @@ async def update_product_endpoint(
     updates: ProductUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    if not updates.model_dump(exclude_unset=True):
+    fields = updates.model_dump(exclude_unset=True)
+    if not fields:
         raise HTTPException(status_code=400, detail="Не указано ни одно поле для обновления")
     try:
-        product = await update_product(db, product_id, updates)
+        if WRITE_QUEUE_ENABLED:
+            product = await product_write_queue.submit(product_id, fields)
+        else:
+            product = await update_product(db, product_id, updates)
         return ProductResponse.model_validate(product)
+    except WriteQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except ValueError as e:
         status = 404 if "не найд" in str(e).lower() else 400
         raise HTTPException(status_code=status, detail=str(e))
@@ -102,27 +275,144 @@ async def create_category_endpoint(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@category_router.post("/bulk", response_model=list[CategoryBulkResult])
+async def create_categories_bulk_endpoint(
+    categories: list[CategoryCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_db)
+):
+    created = await create_categories_bulk(db, categories)
+    return _category_results((category, None) for category in created)
+
+
+@category_router.patch("/bulk", response_model=list[CategoryBulkResult])
+async def update_categories_bulk_endpoint(
+    items: list[CategoryBulkUpdateItem] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_db)
+):
+    return _category_results(await update_categories_bulk(db, items))
+
+
+@category_router.post("/bulk/delete", response_model=list[CategoryBulkResult])
+async def delete_categories_bulk_endpoint(
+    request: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    return _category_results(await delete_categories_bulk(db, request.ids))
+
+
 @category_router.get("/", response_model=list[CategoryResponse])
 async def list_categories(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    sort: CategorySort = Query("id", description="Поле сортировки, «-» — по убыванию"),
     db: AsyncSession = Depends(get_db)
 ):
-    categories = await get_all_categories(db, skip=skip, limit=limit)
-    return [CategoryResponse.model_validate(cat) for cat in categories]
+    try:
+        categories = await get_all_categories(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    token = next_cursor(categories, sort, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    if not_modified := conditional(request, response, list_etag("categories", categories)):
+        return not_modified
+    return _rows_response(categories, response)
+
+
+@category_router.get("/export")
+async def export_categories(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    include_deleted: bool = False,
+):
+    columns = [column.name for column in CATEGORY_EXPORT_COLUMNS]
+    return StreamingResponse(
+        export_rows(
+            lambda db: stream_categories(db, include_deleted=include_deleted),
+            columns,
+            format,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="categories.{format}"'},
+    )
+
+
+@category_router.get("/stats", response_model=list[CategoryStatsResponse])
+async def list_category_stats(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        stats = await get_all_category_stats(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    token = next_cursor(stats, "id", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return _rows_response(stats, response)
 
 
 @category_router.get("/{category_id}", response_model=CategoryResponse)
 async def get_category_endpoint_by_id(
     category_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
     category = await get_category(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Категория не найдена")
+    if not_modified := conditional(request, response, entity_etag("category", category)):
+        return not_modified
     return CategoryResponse.model_validate(category)
 
 
+@category_router.get("/{category_id}/products", response_model=list[ProductResponse])
+async def list_category_products(
+    category_id: int,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    sort: ProductSort = Query("id", description="Поле сортировки, «-» — по убыванию"),
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    include_deleted: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    if not await get_category(db, category_id, include_deleted=include_deleted):
+        raise HTTPException(status_code=404, detail="Категория не найдена")
+    return await _product_page(
+        request,
+        response,
+        db,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        include_deleted=include_deleted,
+    )
+
+
+@category_router.get("/{category_id}/stats", response_model=CategoryStatsResponse)
+async def get_category_stats_endpoint(
+    category_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    stats = await get_category_stats(db, category_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Категория не найдена")
+    return stats
+
+
 @category_router.patch("/{category_id}", response_model=CategoryResponse)
 async def update_category_endpoint(
     category_id: int,
@@ -135,19 +425,39 @@ async def update_category_endpoint(
         category = await update_category(db, category_id, updates)
         return CategoryResponse.model_validate(category)
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        status = 404 if "не найд" in str(e).lower() else 400
+        raise HTTPException(status_code=status, detail=str(e))
 
 
-@category_router.delete("/{category_id}", response_model=CategoryResponse)
+@category_router.delete("/{category_id}", response_model=CategoryDeleteResponse)
 async def delete_category_endpoint(
     category_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        category = await delete_category(db, category_id)
-        return CategoryResponse.model_validate(category)
+        category, deleted_products = await delete_category(db, category_id)
+        return CategoryDeleteResponse(
+            **CategoryResponse.model_validate(category).model_dump(),
+            deleted_products=deleted_products,
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@category_router.post("/{category_id}/restore", response_model=CategoryRestoreResponse)
+async def restore_category_endpoint(
+    category_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        category, restored_products = await restore_category(db, category_id)
+        return CategoryRestoreResponse(
+            **CategoryResponse.model_validate(category).model_dump(),
+            restored_products=restored_products,
+        )
+    except ValueError as e:
+        status = 404 if "не найд" in str(e).lower() else 400
+        raise HTTPException(status_code=status, detail=str(e))
+
+
 routers = (product_router, category_router)
@@ -0,0 +1,106 @@
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "300"))
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш с ограничением по размеру и времени жизни записи.
+
+    Рассчитан на один event loop, поэтому обходится без блокировок.
+    """
+
+    def __init__(self, name: str, maxsize: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.maxsize = maxsize if CACHE_ENABLED else 0
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # растёт при каждой инвалидации: чтение, начатое до записи, не положит в кэш устаревшие данные
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: Hashable) -> object:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: object, *, generation: int | None = None) -> None:
+        if self.maxsize <= 0 or (generation is not None and generation != self.generation):
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, object], bool]) -> None:
+        stale = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        self.invalidate(stale)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+product_cache = TTLCache("products")
+category_cache = TTLCache("categories")
+category_name_cache = TTLCache("category_names")
+product_list_cache = TTLCache("product_lists", maxsize=min(CACHE_MAX_ENTRIES, 1000))
+category_list_cache = TTLCache("category_lists", maxsize=min(CACHE_MAX_ENTRIES, 1000))
+# Ответы агента; ключ включает версию каталога, поэтому записи не сбрасываются, а вытесняются
+chat_response_cache = TTLCache(
+    "chat_responses",
+    maxsize=CHAT_CACHE_MAX_ENTRIES if CHAT_CACHE_ENABLED else 0,
+    ttl=CHAT_CACHE_TTL_SECONDS,
+)
+
+CACHES = (
+    product_cache,
+    category_cache,
+    category_name_cache,
+    product_list_cache,
+    category_list_cache,
+    chat_response_cache,
+)
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in CACHES}
+
+
+def clear_caches() -> None:
+    for cache in CACHES:
+        cache.clear()
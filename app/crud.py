@@ -1,19 +1,103 @@
+from collections.abc import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import exists, func, insert, inspect, literal, select, union, update
+from sqlalchemy.engine import RowMapping
+
+from .cache import (
+    MISSING,
+    TTLCache,
+    category_cache,
+    category_list_cache,
+    category_name_cache,
+    product_cache,
+    product_list_cache,
+)
+from .models import Category, CategoryStats, Product
+from .pagination import apply_keyset, order_by_sort, sort_field
+from .search import build_search_query, search_tokens
+from .stats import lock_category_stats
+from .schemas import (
+    CategoryCreate,
+    ProductCreate,
+    CategoryUpdate,
+    ProductUpdate,
+    CategoryBulkUpdateItem,
+    ProductBulkUpdateItem,
+    CategoryResponse,
+    ProductResponse,
+)
+
+
+def _snapshot(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+async def _cached_one(cache: TTLCache, key, model, load):
+    # В кэше лежат снимки колонок, а не ORM-объекты: объект сессии нельзя отдавать в другие сессии
+    values = cache.get(key)
+    if values is not MISSING:
+        return model(**values) if values is not None else None
+    generation = cache.generation
+    obj = await load()
+    cache.set(key, _snapshot(obj) if obj is not None else None, generation=generation)
+    return obj
 
-from .models import Category, Product
-from .schemas import CategoryCreate, ProductCreate, CategoryUpdate, ProductUpdate
+
+async def _cached_rows(cache: TTLCache, key, stmt, db: AsyncSession) -> list[dict]:
+    # Страница хранится и отдаётся как есть: вызывающий код строки не изменяет
+    rows = cache.get(key)
+    if rows is not MISSING:
+        return rows
+    generation = cache.generation
+    result = await db.execute(stmt)
+    rows = [dict(row) for row in result.mappings()]
+    cache.set(key, rows, generation=generation)
+    return rows
+
+
+def _invalidate_products(product_ids) -> None:
+    product_cache.invalidate((product_id, flag) for product_id in product_ids for flag in (False, True))
+    product_list_cache.clear()
+
+
+def _invalidate_categories(category_ids, names=(), *, cascade: bool = False) -> None:
+    category_cache.invalidate((category_id, flag) for category_id in category_ids for flag in (False, True))
+    category_name_cache.invalidate((name, flag) for name in names for flag in (False, True))
+    category_list_cache.clear()
+    if cascade:
+        ids = set(category_ids)
+        # отрицательные записи тоже сбрасываем: у них нет category_id, а восстановление их оживляет
+        product_cache.invalidate_where(
+            lambda key, values: values is None or values["category_id"] in ids
+        )
+        product_list_cache.clear()
+
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    # Каждая запись увеличивает version строки, а вставка добавляет строку с version >= 1,
+    # поэтому сумма растёт при любом изменении каталога в любом воркере
+    total = select(func.coalesce(func.sum(Product.version), 0)).scalar_subquery() + select(
+        func.coalesce(func.sum(Category.version), 0)
+    ).scalar_subquery()
+    result = await db.execute(select(total))
+    return result.scalar_one()
+
+
+def _live_category(category_id: int):
+    return exists().where(Category.id == category_id, Category.is_deleted.is_(False))
 
 
 async def create_category(db: AsyncSession, category: CategoryCreate) -> Category:
-    db_category = Category(**category.model_dump())
-    db.add(db_category)
+    # Запись и чтение сгенерированных полей — одним запросом INSERT ... RETURNING
+    result = await db.execute(insert(Category).values(**category.model_dump()).returning(Category))
+    db_category = result.scalar_one()
     await db.commit()
-    await db.refresh(db_category)
+    _invalidate_categories([db_category.id], [db_category.name])
     return db_category
 
 
-async def get_category(
+async def _select_category(
     db: AsyncSession,
     category_id: int,
     *,
@@ -26,7 +110,21 @@ async def get_category(
     return result.scalar_one_or_none()
 
 
-async def get_category_by_name(
+async def get_category(
+    db: AsyncSession,
+    category_id: int,
+    *,
+    include_deleted: bool = False
+) -> Category | None:
+    return await _cached_one(
+        category_cache,
+        (category_id, include_deleted),
+        Category,
+        lambda: _select_category(db, category_id, include_deleted=include_deleted),
+    )
+
+
+async def _select_category_by_name(
     db: AsyncSession,
     name: str,
     *,
@@ -39,56 +137,116 @@ async def get_category_by_name(
     return result.scalar_one_or_none()
 
 
+async def get_category_by_name(
+    db: AsyncSession,
+    name: str,
+    *,
+    include_deleted: bool = False
+) -> Category | None:
+    return await _cached_one(
+        category_name_cache,
+        (name, include_deleted),
+        Category,
+        lambda: _select_category_by_name(db, name, include_deleted=include_deleted),
+    )
+
+
 async def update_category(
     db: AsyncSession,
     category_id: int,
     data: CategoryUpdate
 ) -> Category:
-    category = await get_category(db, category_id)
+    updates = data.model_dump(exclude_unset=True)
+    if field := empty_required_field(updates, Category):
+        raise ValueError(f"Поле {field} не может быть пустым")
+    if not updates:
+        category = await _select_category(db, category_id)
+    else:
+        result = await db.execute(
+            update(Category)
+            .where(Category.id == category_id, Category.is_deleted.is_(False))
+            .values(**updates, version=Category.version + 1)
+            .returning(Category)
+        )
+        category = result.scalar_one_or_none()
     if not category:
         raise ValueError(f"Категория с ID {category_id} не найдена")
 
-    updates = data.model_dump(exclude_unset=True)
     if updates:
-        for field, value in updates.items():
-            setattr(category, field, value)
         await db.commit()
-        await db.refresh(category)
+        if "name" in updates:
+            # старое имя UPDATE не возвращает: сбрасываем записи кэша имён, указывающие на категорию
+            category_name_cache.invalidate_where(
+                lambda key, values: values is not None and values["id"] == category_id
+            )
+        _invalidate_categories([category_id], [category.name])
     return category
 
 
-async def delete_category(db: AsyncSession, category_id: int) -> Category:
-    category = await get_category(db, category_id)
+async def delete_category(db: AsyncSession, category_id: int) -> tuple[Category, int]:
+    result = await db.execute(
+        update(Category)
+        .where(Category.id == category_id, Category.is_deleted.is_(False))
+        .values(is_deleted=True, version=Category.version + 1)
+        .returning(Category)
+    )
+    category = result.scalar_one_or_none()
     if not category:
         raise ValueError(f"Категория с ID {category_id} не найдена")
 
-    category.is_deleted = True
     result = await db.execute(
-        select(Product).filter(
-            Product.category_id == category_id,
-            Product.is_deleted.is_(False)
-        )
+        update(Product)
+        .where(Product.category_id == category_id, Product.is_deleted.is_(False))
+        .values(is_deleted=True, deleted_with_category=True, version=Product.version + 1)
     )
-    for product in result.scalars().all():
-        product.is_deleted = True
     await db.commit()
-    await db.refresh(category)
-    return category
+    _invalidate_categories([category_id], [category.name], cascade=True)
+    return category, result.rowcount
 
 
-async def create_product(db: AsyncSession, product: ProductCreate) -> Product:
-    category = await get_category(db, product.category_id)
+async def restore_category(db: AsyncSession, category_id: int) -> tuple[Category, int]:
+    result = await db.execute(
+        update(Category)
+        .where(Category.id == category_id, Category.is_deleted.is_(True))
+        .values(is_deleted=False, version=Category.version + 1)
+        .returning(Category)
+    )
+    category = result.scalar_one_or_none()
     if not category:
+        # ничего не обновлено: отдельный запрос только чтобы выбрать текст ошибки
+        if await _select_category(db, category_id, include_deleted=True):
+            raise ValueError(f"Категория с ID {category_id} не удалена")
+        raise ValueError(f"Категория с ID {category_id} не найдена")
+
+    result = await db.execute(
+        update(Product)
+        # товары, удалённые по одному до удаления категории, остаются удалёнными
+        .where(Product.category_id == category_id, Product.deleted_with_category.is_(True))
+        .values(is_deleted=False, deleted_with_category=False, version=Product.version + 1)
+    )
+    await db.commit()
+    _invalidate_categories([category_id], [category.name], cascade=True)
+    return category, result.rowcount
+
+
+async def create_product(db: AsyncSession, product: ProductCreate) -> Product:
+    # INSERT ... SELECT ... WHERE EXISTS: строка появляется, только если категория жива,
+    # поэтому проверка категории, вставка и чтение результата — один запрос
+    values = product.model_dump()
+    columns = Product.__table__.c
+    source = select(
+        *(literal(value, columns[field].type) for field, value in values.items())
+    ).where(_live_category(product.category_id))
+    result = await db.execute(insert(Product).from_select(list(values), source).returning(Product))
+    db_product = result.scalar_one_or_none()
+    if not db_product:
         raise ValueError(f"Категория с ID {product.category_id} не найдена")
-    
-    db_product = Product(**product.model_dump())
-    db.add(db_product)
     await db.commit()
-    await db.refresh(db_product)
+    _invalidate_products([db_product.id])
     return db_product
 
 
-async def get_product(
+async def _select_product(
     db: AsyncSession,
     product_id: int,
     *,
@@ -101,55 +259,460 @@ async def get_product(
     return result.scalar_one_or_none()
 
 
+async def get_product(
+    db: AsyncSession,
+    product_id: int,
+    *,
+    include_deleted: bool = False
+) -> Product | None:
+    return await _cached_one(
+        product_cache,
+        (product_id, include_deleted),
+        Product,
+        lambda: _select_product(db, product_id, include_deleted=include_deleted),
+    )
+
+
 async def update_product(
     db: AsyncSession,
     product_id: int,
     data: ProductUpdate
 ) -> Product:
-    product = await get_product(db, product_id)
-    if not product:
-        raise ValueError(f"Продукт с ID {product_id} не найден")
-
     updates = data.model_dump(exclude_unset=True)
+    if field := empty_required_field(updates, Product):
+        raise ValueError(f"Поле {field} не может быть пустым")
+    if not updates:
+        product = await _select_product(db, product_id)
+        if not product:
+            raise ValueError(f"Продукт с ID {product_id} не найден")
+        return product
+
+    stmt = update(Product).where(Product.id == product_id, Product.is_deleted.is_(False))
     if "category_id" in updates:
-        category = await get_category(db, updates["category_id"])
-        if not category:
+        # перенос меняет строки статистики двух категорий: блокируем их по порядку ID заранее
+        await lock_category_stats(db, union(
+            select(Product.category_id).where(Product.id == product_id),
+            select(literal(updates["category_id"])),
+        ))
+        stmt = stmt.where(_live_category(updates["category_id"]))
+    result = await db.execute(stmt.values(**updates, version=Product.version + 1).returning(Product))
+    product = result.scalar_one_or_none()
+    if not product:
+        if "category_id" in updates and await _select_product(db, product_id):
             raise ValueError(f"Категория с ID {updates['category_id']} не найдена")
-
-    if updates:
-        for field, value in updates.items():
-            setattr(product, field, value)
-        await db.commit()
-        await db.refresh(product)
+        raise ValueError(f"Продукт с ID {product_id} не найден")
+    await db.commit()
+    _invalidate_products([product_id])
     return product
 
 
 async def delete_product(db: AsyncSession, product_id: int) -> Product:
-    product = await get_product(db, product_id)
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.is_deleted.is_(False))
+        .values(is_deleted=True, version=Product.version + 1)
+        .returning(Product)
+    )
+    product = result.scalar_one_or_none()
     if not product:
         raise ValueError(f"Продукт с ID {product_id} не найден")
-
-    product.is_deleted = True
     await db.commit()
-    await db.refresh(product)
+    _invalidate_products([product_id])
     return product
 
 
-async def get_all_categories(db: AsyncSession, skip: int = 0, limit: int = 100) -> list[Category]:
+async def _existing_category_ids(db: AsyncSession, category_ids: set[int]) -> set[int]:
+    if not category_ids:
+        return set()
     result = await db.execute(
-        select(Category)
-        .filter(Category.is_deleted.is_(False))
-        .offset(skip)
-        .limit(limit)
+        select(Category.id).filter(
+            Category.id.in_(category_ids),
+            Category.is_deleted.is_(False)
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def _update_returning(db: AsyncSession, stmt, model):
+    # version растёт в SQL, а не в Python: параллельные пакеты не перезапишут чужое увеличение.
+    # Объект отсоединяется, чтобы повторное обновление той же записи в пакете дало свой снимок
+    result = await db.execute(stmt.returning(model))
+    obj = result.scalar_one_or_none()
+    if obj is not None:
+        db.expunge(obj)
+    return obj
+
+
+def empty_required_field(updates: dict, model) -> str | None:
+    """Поле обновления, которому передан None, хотя колонка модели NOT NULL."""
+    columns = model.__table__.c
+    for field, value in updates.items():
+        if value is None and not columns[field].nullable:
+            return field
+    return None
+
+
+async def create_categories_bulk(db: AsyncSession, categories: list[CategoryCreate]) -> list[Category]:
+    result = await db.execute(
+        insert(Category).returning(Category, sort_by_parameter_order=True),
+        [category.model_dump() for category in categories]
+    )
+    created = list(result.scalars().all())
+    await db.commit()
+    _invalidate_categories([category.id for category in created], [category.name for category in created])
+    return created
+
+
+async def update_categories_bulk(
+    db: AsyncSession,
+    items: list[CategoryBulkUpdateItem]
+) -> list[tuple[Category | None, str | None]]:
+    result = await db.execute(
+        select(Category.id, Category.name).filter(
+            Category.id.in_({item.id for item in items}),
+            Category.is_deleted.is_(False)
+        )
     )
-    return list(result.scalars().all())
+    old_names = dict(result.all())
+
+    outcomes: list[tuple[Category | None, str | None]] = []
+    for item in items:
+        updates = item.model_dump(exclude_unset=True, exclude={"id"})
+        if item.id not in old_names:
+            outcomes.append((None, f"Категория с ID {item.id} не найдена"))
+        elif not updates:
+            outcomes.append((None, "Не указано ни одно поле для обновления"))
+        elif field := empty_required_field(updates, Category):
+            outcomes.append((None, f"Поле {field} не может быть пустым"))
+        else:
+            category = await _update_returning(
+                db,
+                update(Category)
+                .where(Category.id == item.id, Category.is_deleted.is_(False))
+                .values(**updates, version=Category.version + 1),
+                Category,
+            )
+            if category is None:
+                outcomes.append((None, f"Категория с ID {item.id} не найдена"))
+            else:
+                outcomes.append((category, None))
+    await db.commit()
+    _invalidate_categories(
+        old_names,
+        list(old_names.values()) + [category.name for category, _ in outcomes if category is not None]
+    )
+    return outcomes
 
 
-async def get_all_products(db: AsyncSession, skip: int = 0, limit: int = 100) -> list[Product]:
+async def delete_categories_bulk(
+    db: AsyncSession,
+    category_ids: list[int]
+) -> list[tuple[Category | None, str | None]]:
     result = await db.execute(
-        select(Product)
-        .filter(Product.is_deleted.is_(False))
-        .offset(skip)
-        .limit(limit)
+        update(Category)
+        .where(Category.id.in_(category_ids), Category.is_deleted.is_(False))
+        .values(is_deleted=True, version=Category.version + 1)
+        .returning(Category)
+    )
+    deleted = {category.id: category for category in result.scalars().all()}
+    if deleted:
+        await lock_category_stats(db, sorted(deleted))
+        await db.execute(
+            update(Product)
+            .where(Product.category_id.in_(deleted), Product.is_deleted.is_(False))
+            .values(is_deleted=True, deleted_with_category=True, version=Product.version + 1)
+        )
+    await db.commit()
+    _invalidate_categories(deleted, [category.name for category in deleted.values()], cascade=True)
+    outcomes: list[tuple[Category | None, str | None]] = []
+    seen: set[int] = set()
+    for category_id in category_ids:
+        # удалена одна строка: успехом считается только первое упоминание ID
+        if category_id in seen:
+            outcomes.append((None, f"Категория с ID {category_id} уже указана в запросе"))
+        elif category_id in deleted:
+            outcomes.append((deleted[category_id], None))
+        else:
+            outcomes.append((None, f"Категория с ID {category_id} не найдена"))
+        seen.add(category_id)
+    return outcomes
+
+
+async def create_products_bulk(
+    db: AsyncSession,
+    products: list[ProductCreate]
+) -> list[tuple[Product | None, str | None]]:
+    known = await _existing_category_ids(db, {product.category_id for product in products})
+    rows = [product.model_dump() for product in products if product.category_id in known]
+    created = iter(())
+    if rows:
+        await lock_category_stats(db, sorted({row["category_id"] for row in rows}))
+        result = await db.execute(
+            insert(Product).returning(Product, sort_by_parameter_order=True),
+            rows
+        )
+        created_products = list(result.scalars().all())
+        await db.commit()
+        _invalidate_products(product.id for product in created_products)
+        created = iter(created_products)
+    return [
+        (next(created), None) if product.category_id in known
+        else (None, f"Категория с ID {product.category_id} не найдена")
+        for product in products
+    ]
+
+
+async def update_products_bulk(
+    db: AsyncSession,
+    items: list[ProductBulkUpdateItem]
+) -> list[tuple[Product | None, str | None]]:
+    result = await db.execute(
+        select(Product.id, Product.category_id).filter(
+            Product.id.in_({item.id for item in items}),
+            Product.is_deleted.is_(False)
+        )
+    )
+    current = dict(result.all())
+    known = await _existing_category_ids(
+        db, {item.category_id for item in items if item.category_id is not None}
+    )
+    # до первого UPDATE: иначе триггер заблокирует строки статистики в порядке элементов пакета
+    await lock_category_stats(db, sorted(known | set(current.values())))
+
+    outcomes: list[tuple[Product | None, str | None]] = []
+    for item in items:
+        updates = item.model_dump(exclude_unset=True, exclude={"id"})
+        if item.id not in current:
+            outcomes.append((None, f"Продукт с ID {item.id} не найден"))
+        elif not updates:
+            outcomes.append((None, "Не указано ни одно поле для обновления"))
+        elif field := empty_required_field(updates, Product):
+            outcomes.append((None, f"Поле {field} не может быть пустым"))
+        elif "category_id" in updates and updates["category_id"] not in known:
+            outcomes.append((None, f"Категория с ID {updates['category_id']} не найдена"))
+        else:
+            stmt = update(Product).where(Product.id == item.id, Product.is_deleted.is_(False))
+            if "category_id" in updates:
+                stmt = stmt.where(_live_category(updates["category_id"]))
+            product = await _update_returning(
+                db, stmt.values(**updates, version=Product.version + 1), Product
+            )
+            if product is not None:
+                outcomes.append((product, None))
+            elif "category_id" in updates:
+                outcomes.append((None, f"Категория с ID {updates['category_id']} не найдена"))
+            else:
+                outcomes.append((None, f"Продукт с ID {item.id} не найден"))
+    await db.commit()
+    _invalidate_products(current)
+    return outcomes
+
+
+async def delete_products_bulk(
+    db: AsyncSession,
+    product_ids: list[int]
+) -> list[tuple[Product | None, str | None]]:
+    await lock_category_stats(
+        db,
+        select(Product.category_id).where(Product.id.in_(product_ids), Product.is_deleted.is_(False))
+    )
+    result = await db.execute(
+        update(Product)
+        .where(Product.id.in_(product_ids), Product.is_deleted.is_(False))
+        .values(is_deleted=True, version=Product.version + 1)
+        .returning(Product)
+    )
+    deleted = {product.id: product for product in result.scalars().all()}
+    await db.commit()
+    _invalidate_products(deleted)
+    outcomes: list[tuple[Product | None, str | None]] = []
+    seen: set[int] = set()
+    for product_id in product_ids:
+        if product_id in seen:
+            outcomes.append((None, f"Продукт с ID {product_id} уже указан в запросе"))
+        elif product_id in deleted:
+            outcomes.append((deleted[product_id], None))
+        else:
+            outcomes.append((None, f"Продукт с ID {product_id} не найден"))
+        seen.add(product_id)
+    return outcomes
+
+
+async def get_categories_by_names(db: AsyncSession, names: list[str]) -> dict[str, Category]:
+    if not names:
+        return {}
+    result = await db.execute(
+        select(Category).filter(Category.name.in_(set(names)), Category.is_deleted.is_(False))
+    )
+    return {category.name: category for category in result.scalars().all()}
+
+
+async def get_products_by_ids(db: AsyncSession, product_ids: list[int]) -> dict[int, Product]:
+    if not product_ids:
+        return {}
+    result = await db.execute(
+        select(Product).filter(Product.id.in_(set(product_ids)), Product.is_deleted.is_(False))
+    )
+    return {product.id: product for product in result.scalars().all()}
+
+
+CATEGORY_SORT_COLUMNS = {"id": Category.id, "name": Category.name}
+PRODUCT_SORT_COLUMNS = {"id": Product.id, "name": Product.name, "price": Product.price}
+
+# Списки выбирают только колонки схемы ответа и в её порядке: строка сразу готова к JSON
+CATEGORY_ROW_COLUMNS = [Category.__table__.c[name] for name in CategoryResponse.model_fields]
+PRODUCT_ROW_COLUMNS = [Product.__table__.c[name] for name in ProductResponse.model_fields]
+
+
+async def get_all_categories(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    cursor: str | None = None,
+    sort: str = "id"
+) -> list[dict]:
+    stmt = select(*CATEGORY_ROW_COLUMNS).filter(Category.is_deleted.is_(False))
+    sort_column = CATEGORY_SORT_COLUMNS[sort_field(sort)[0]]
+    if skip and not cursor:
+        stmt = order_by_sort(stmt, sort_column, Category.id, sort).offset(skip).limit(limit)
+    else:
+        stmt = apply_keyset(stmt, sort_column, Category.id, cursor, sort, limit)
+    return await _cached_rows(category_list_cache, (skip, limit, cursor, sort), stmt, db)
+
+
+async def get_all_products(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    cursor: str | None = None,
+    sort: str = "id",
+    category_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    include_deleted: bool = False
+) -> list[dict]:
+    stmt = select(*PRODUCT_ROW_COLUMNS)
+    if category_id is not None:
+        stmt = stmt.filter(Product.category_id == category_id)
+    if not include_deleted:
+        stmt = stmt.filter(Product.is_deleted.is_(False))
+    if min_price is not None:
+        stmt = stmt.filter(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.filter(Product.price <= max_price)
+
+    sort_column = PRODUCT_SORT_COLUMNS[sort_field(sort)[0]]
+    if skip and not cursor:
+        stmt = order_by_sort(stmt, sort_column, Product.id, sort).offset(skip).limit(limit)
+    else:
+        stmt = apply_keyset(stmt, sort_column, Product.id, cursor, sort, limit)
+    key = (skip, limit, cursor, sort, category_id, min_price, max_price, include_deleted)
+    return await _cached_rows(product_list_cache, key, stmt, db)
+
+
+def _live_price_bound(aggregate):
+    # min/max по индексу (category_id, is_deleted, price) — одна проба индекса на категорию
+    return (
+        select(aggregate(Product.price))
+        .where(Product.category_id == Category.id, Product.is_deleted.is_(False))
+        .scalar_subquery()
     )
-    return list(result.scalars().all())
+
+
+def _category_stats_query():
+    # Число и сумма читаются из category_stats, которую ведут триггеры: без прохода по товарам
+    return (
+        select(
+            Category.id,
+            Category.name,
+            func.coalesce(CategoryStats.product_count, 0).label("product_count"),
+            func.coalesce(CategoryStats.price_sum, 0.0).label("price_sum"),
+            _live_price_bound(func.min).label("min_price"),
+            _live_price_bound(func.max).label("max_price"),
+        )
+        .outerjoin(CategoryStats, CategoryStats.category_id == Category.id)
+        .filter(Category.is_deleted.is_(False))
+    )
+
+
+def _stats_row(row) -> dict:
+    stats = dict(row)
+    price_sum = stats.pop("price_sum")
+    count = stats["product_count"]
+    stats["avg_price"] = round(price_sum / count, 2) if count else None
+    return stats
+
+
+async def get_category_stats(db: AsyncSession, category_id: int) -> dict | None:
+    result = await db.execute(_category_stats_query().filter(Category.id == category_id))
+    row = result.mappings().one_or_none()
+    return _stats_row(row) if row is not None else None
+
+
+async def get_all_category_stats(
+    db: AsyncSession,
+    limit: int = 100,
+    *,
+    cursor: str | None = None
+) -> list[dict]:
+    stmt = apply_keyset(_category_stats_query(), Category.id, Category.id, cursor, "id", limit)
+    result = await db.execute(stmt)
+    return [_stats_row(row) for row in result.mappings()]
+
+
+EXPORT_BATCH_SIZE = 1000
+
+
+async def _stream_rows(db: AsyncSession, stmt) -> AsyncIterator[list[RowMapping]]:
+    # Core-select по колонкам: строки не попадают в identity map сессии
+    result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.mappings().partitions():
+        yield partition
+
+
+# Выгрузка отдаёт поля схемы ответа в порядке колонок таблицы: служебные колонки
+# (например, deleted_with_category) наружу не попадают
+CATEGORY_EXPORT_COLUMNS = [column for column in Category.__table__.c if column.name in CategoryResponse.model_fields]
+PRODUCT_EXPORT_COLUMNS = [column for column in Product.__table__.c if column.name in ProductResponse.model_fields]
+
+
+def stream_categories(db: AsyncSession, *, include_deleted: bool = False) -> AsyncIterator[list[RowMapping]]:
+    table = Category.__table__
+    stmt = select(*CATEGORY_EXPORT_COLUMNS).order_by(table.c.id)
+    if not include_deleted:
+        stmt = stmt.filter(table.c.is_deleted.is_(False))
+    return _stream_rows(db, stmt)
+
+
+def stream_products(db: AsyncSession, *, include_deleted: bool = False) -> AsyncIterator[list[RowMapping]]:
+    table = Product.__table__
+    stmt = select(*PRODUCT_EXPORT_COLUMNS).order_by(table.c.id)
+    if not include_deleted:
+        stmt = stmt.filter(table.c.is_deleted.is_(False))
+    return _stream_rows(db, stmt)
+
+
+async def search_products(
+    db: AsyncSession,
+    query: str,
+    *,
+    category_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    limit: int = 20
+) -> list[dict]:
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+    stmt = build_search_query(db.bind.dialect.name, query, tokens).with_only_columns(*PRODUCT_ROW_COLUMNS)
+    stmt = stmt.filter(Product.is_deleted.is_(False))
+    if category_id is not None:
+        stmt = stmt.filter(Product.category_id == category_id)
+    if min_price is not None:
+        stmt = stmt.filter(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.filter(Product.price <= max_price)
+    result = await db.execute(stmt.limit(limit))
+    return [dict(row) for row in result.mappings()]
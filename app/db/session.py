@@ -1,16 +1,78 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import StaticPool
 
-DATABASE_URL = "sqlite+aiosqlite:///./giga.db"
+from ..metrics import instrument_engine
+
+load_dotenv()
+
+
+def _normalize_url(url: str) -> str:
+    # postgres:// и postgresql:// из окружения переводим на асинхронный драйвер
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./giga.db"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+
+def _engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
+    if parsed.database in (None, "", ":memory:"):
+        # in-memory база существует только внутри одного соединения
+        return {"connect_args": connect_args, "poolclass": StaticPool}
+    return {
+        "connect_args": connect_args,
+        "pool_size": SQLITE_POOL_SIZE,
+        "max_overflow": 0,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
 
 engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-    echo=False
+    echo=False,
+    **_engine_options(DATABASE_URL)
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL: читатели не блокируются писателем и наоборот
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # SQLite по умолчанию не проверяет внешние ключи: products.category_id держит ограничение
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+instrument_engine(engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -24,8 +86,34 @@ Base = declarative_base()
 
 async def init_db():
     from app import models  # noqa: F401
+    from app.search import create_search_index
+    from app.stats import create_category_stats
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(create_search_index)
+        await conn.run_sync(create_category_stats)
+
+
+def _add_missing_columns(sync_conn):
+    # Новые колонки со server_default добавляются в уже существующие таблицы без миграций
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+                sync_conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                if backfill := column.info.get("backfill"):
+                    sync_conn.exec_driver_sql(backfill)
+
+
+def _create_missing_indexes(sync_conn):
+    # create_all не добавляет новые индексы в уже существующие таблицы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
 
 
 async def get_db():
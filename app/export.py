@@ -0,0 +1,40 @@
+import csv
+import io
+from collections.abc import AsyncIterator, Callable
+
+import orjson
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db.session import AsyncSessionLocal
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_chunk(rows: list[RowMapping]) -> bytes:
+    return b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+
+
+def _csv_chunk(rows: list[RowMapping], columns: list[str], *, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([row[column] for column in columns] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_rows(
+    stream: Callable[[AsyncSession], AsyncIterator[list[RowMapping]]],
+    columns: list[str],
+    fmt: str,
+) -> AsyncIterator[bytes]:
+    # Сессия живёт внутри генератора: зависимость get_db закрывается до отправки тела
+    async with AsyncSessionLocal() as db:
+        if fmt == "csv":
+            yield _csv_chunk([], columns, header=True)
+        async for rows in stream(db):
+            yield _csv_chunk(rows, columns) if fmt == "csv" else _ndjson_chunk(rows)
@@ -1,49 +1,54 @@
-import uuid
+import asyncio
 
-from fastapi import FastAPI, HTTPException
-from langchain_core.messages import HumanMessage
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from .cache import cache_stats
 from .db.session import init_db
-from .schemas import ChatMessage, ChatResponse
-from .agent.graph import app as agent_app
+from .metrics import MetricsMiddleware, render as render_metrics
+from .agent.loader import AGENT_ENABLED, AGENT_WARMUP, load_agent
+from .api.chat import chat_router
 from .api.routes import product_router, category_router
+from .write_queue import product_write_queue
 
 app = FastAPI(title="Giga Agent API")
+app.add_middleware(MetricsMiddleware)
+
+
+_background_tasks: set[asyncio.Task] = set()
 
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
     print("База данных инициализирована")
+    if AGENT_ENABLED and AGENT_WARMUP:
+        # Агент грузится в фоне: CRUD-маршруты отвечают, не дожидаясь его
+        task = asyncio.create_task(load_agent())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # обновления, принятые очередью записи, не теряются при остановке
+    await product_write_queue.stop()
 
 
 app.include_router(product_router)
 app.include_router(category_router)
+if AGENT_ENABLED:
+    app.include_router(chat_router)
+
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    return cache_stats()
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(
-    message: ChatMessage,
-):
-    thread_id = message.thread_id or str(uuid.uuid4())
-
-    config = {"configurable": {"thread_id": thread_id}}
-
-    human_message = HumanMessage(content=message.message)
-    
-    try:
-        result = await agent_app.ainvoke(
-            {"messages": [human_message]},
-            config=config
-        )
-
-        last_message = result["messages"][-1]
-        response_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
-        
-        return ChatResponse(response=response_text, thread_id=thread_id)
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка агента: {str(e)}")
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
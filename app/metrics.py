@@ -0,0 +1,226 @@
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # на каждую серию: счётчики по корзинам (последняя — +Inf), сумма
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = (*self.labelnames, "le")
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Значение считывается функцией в момент отдачи /metrics."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float | None]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> list[str]:
+        value = self.read()
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+REGISTRY: list = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_requests = register(Counter(
+    "http_requests_total", "HTTP-запросы по маршруту и статусу", ("method", "route", "status")
+))
+http_latency = register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route")
+))
+http_db_queries = register(Histogram(
+    "http_request_db_queries", "SQL-запросов на один HTTP-запрос", ("method", "route"), COUNT_BUCKETS
+))
+http_db_time = register(Histogram(
+    "http_request_db_seconds", "Суммарное время SQL-запросов одного HTTP-запроса", ("method", "route"), DB_BUCKETS
+))
+db_queries = register(Counter("db_queries_total", "SQL-запросы по типу", ("statement",)))
+db_latency = register(Histogram("db_query_duration_seconds", "Время SQL-запроса", ("statement",), DB_BUCKETS))
+agent_steps = register(Counter("agent_steps_total", "Шаги графа агента по узлам", ("node",)))
+llm_latency = register(Histogram("agent_llm_duration_seconds", "Время вызова LLM", ("status",)))
+tool_calls = register(Counter("agent_tool_calls_total", "Вызовы инструментов агента", ("tool", "status")))
+tool_latency = register(Histogram(
+    "agent_tool_duration_seconds", "Время выполнения инструмента (пакет — целиком)", ("tool",)
+))
+write_queue_updates = register(Counter(
+    "write_queue_updates_total",
+    "Обновления в очереди записи: written, invalid, failed, coalesced, rejected",
+    ("result",),
+))
+write_queue_batch_size = register(Histogram(
+    "write_queue_batch_size", "Товаров в одной транзакции очереди записи", (), BATCH_BUCKETS
+))
+write_queue_flush_latency = register(Histogram(
+    "write_queue_flush_duration_seconds", "Время записи пакета очереди, включая коммит"
+))
+
+
+class RequestStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Считает запросы и их время: всего по типу и в рамках текущего HTTP-запроса."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_queries.inc(kind)
+        db_latency.observe(elapsed, kind)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    pool = sync_engine.pool
+    for attr, name, documentation in (
+        ("size", "db_pool_size", "Размер пула соединений"),
+        ("checkedout", "db_pool_checked_out", "Выданные соединения пула"),
+        ("checkedin", "db_pool_checked_in", "Свободные соединения пула"),
+        ("overflow", "db_pool_overflow", "Соединения сверх размера пула"),
+    ):
+        # у StaticPool нет счётчиков
+        if callable(getattr(pool, attr, None)):
+            register(Gauge(name, documentation, getattr(pool, attr)))
+
+
+class MetricsMiddleware:
+    """Чистое ASGI-middleware: без BaseHTTPMiddleware, чтобы не замедлять стриминговые ответы."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+            # шаблон маршрута, а не путь: ID в пути не раздувают число серий
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(method, route, status["code"])
+            http_latency.observe(time.perf_counter() - started, method, route)
+            http_db_queries.observe(stats.queries, method, route)
+            http_db_time.observe(stats.seconds, method, route)
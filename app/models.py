@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean, Index, LargeBinary, false
 from sqlalchemy.orm import relationship
 
 from .db.session import Base
@@ -11,9 +11,15 @@ class Category(Base):
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
     is_deleted = Column(Boolean, default=False, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
 
     products = relationship("Product", back_populates="category", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_categories_is_deleted_id", "is_deleted", "id"),
+        Index("ix_categories_is_deleted_name_id", "is_deleted", "name", "id"),
+    )
+
 
 class Product(Base):
     __tablename__ = "products"
@@ -24,5 +30,73 @@ class Product(Base):
     price = Column(Float, nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     is_deleted = Column(Boolean, default=False, nullable=False)
+    # товар удалён вместе с категорией: восстановление категории возвращает только такие товары
+    deleted_with_category = Column(
+        Boolean,
+        default=False,
+        server_default=false(),
+        nullable=False,
+        info={
+            # в старой базе причину удаления не узнать: считаем, что удалённые товары удалённых
+            # категорий ушли вместе с категорией, как и восстанавливались раньше
+            "backfill": (
+                "UPDATE products SET deleted_with_category = is_deleted "
+                "WHERE category_id IN (SELECT id FROM categories WHERE is_deleted)"
+            ),
+        },
+    )
+    version = Column(Integer, default=1, server_default="1", nullable=False)
 
     category = relationship("Category", back_populates="products")
+
+    __table_args__ = (
+        Index("ix_products_is_deleted_id", "is_deleted", "id"),
+        Index("ix_products_is_deleted_name_id", "is_deleted", "name", "id"),
+        Index("ix_products_is_deleted_price_id", "is_deleted", "price", "id"),
+        Index("ix_products_category_is_deleted_price", "category_id", "is_deleted", "price", "id"),
+        Index("ix_products_category_is_deleted_id", "category_id", "is_deleted", "id"),
+    )
+
+
+class CategoryStats(Base):
+    """Число и сумма цен живых товаров категории; ведутся триггерами из app/stats.py."""
+
+    __tablename__ = "category_stats"
+
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    product_count = Column(Integer, default=0, server_default="0", nullable=False)
+    price_sum = Column(Float, default=0.0, server_default="0", nullable=False)
+
+
+class ChatThread(Base):
+    __tablename__ = "chat_threads"
+
+    thread_id = Column(String, primary_key=True)
+    updated_at = Column(Float, nullable=False, index=True)
+
+
+class ChatCheckpoint(Base):
+    __tablename__ = "chat_checkpoints"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    parent_checkpoint_id = Column(String, nullable=True)
+    type = Column(String, nullable=False)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String, nullable=False)
+    metadata_blob = Column("metadata", LargeBinary, nullable=False)
+
+
+class ChatWrite(Base):
+    __tablename__ = "chat_writes"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+    task_path = Column(String, nullable=False, default="")
@@ -0,0 +1,60 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    raw = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[object, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload["v"], int(payload["id"])
+        cursor_sort = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Некорректный курсор пагинации")
+    if cursor_sort != sort:
+        raise ValueError("Курсор получен для другой сортировки")
+    return value, last_id
+
+
+def sort_field(sort: str) -> tuple[str, bool]:
+    """«-price» → («price», по убыванию)."""
+    return sort.removeprefix("-"), sort.startswith("-")
+
+
+def order_by_sort(stmt, sort_column, id_column, sort: str):
+    _, descending = sort_field(sort)
+    if sort_column is id_column:
+        return stmt.order_by(id_column.desc() if descending else id_column)
+    if descending:
+        return stmt.order_by(sort_column.desc(), id_column.desc())
+    return stmt.order_by(sort_column, id_column)
+
+
+def apply_keyset(stmt, sort_column, id_column, cursor: str | None, sort: str, limit: int):
+    """Keyset-страница по (sort_column, id): без OFFSET, стоимость не зависит от глубины."""
+    _, descending = sort_field(sort)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        after_id = id_column < last_id if descending else id_column > last_id
+        if sort_column is id_column:
+            stmt = stmt.filter(after_id)
+        else:
+            # сравнение кортежей, а не OR: индекс (..., sort_column, id) ищется сразу с позиции курсора
+            key, bound = tuple_(sort_column, id_column), tuple_(value, last_id)
+            stmt = stmt.filter(key < bound if descending else key > bound)
+    return order_by_sort(stmt, sort_column, id_column, sort).limit(limit)
+
+
+def next_cursor(rows: list[dict], sort: str, limit: int) -> str | None:
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    field, _ = sort_field(sort)
+    return encode_cursor(sort, last[field], last["id"])
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+BULK_MAX_ITEMS = 1000
+
 class CategoryBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Название категории")
     description: str | None = Field(None, max_length=500, description="Описание категории")
@@ -12,11 +14,29 @@ class CategoryCreate(CategoryBase):
 class CategoryResponse(CategoryBase):
     id: int
     is_deleted: bool = Field(default=False, description="Признак мягкого удаления")
+    version: int = Field(default=1, description="Версия записи, растёт при каждом изменении")
 
     class Config:
         from_attributes = True
 
 
+class CategoryDeleteResponse(CategoryResponse):
+    deleted_products: int = Field(..., description="Сколько продуктов категории удалено вместе с ней")
+
+
+class CategoryRestoreResponse(CategoryResponse):
+    restored_products: int = Field(..., description="Сколько продуктов категории восстановлено")
+
+
+class CategoryStatsResponse(BaseModel):
+    id: int = Field(..., description="ID категории")
+    name: str
+    product_count: int = Field(..., description="Число неудалённых товаров")
+    min_price: float | None = Field(None, description="Минимальная цена; null, если товаров нет")
+    max_price: float | None = Field(None, description="Максимальная цена; null, если товаров нет")
+    avg_price: float | None = Field(None, description="Средняя цена; null, если товаров нет")
+
+
 class CategoryUpdate(BaseModel):
     name: str | None = Field(None, min_length=1, max_length=100)
     description: str | None = Field(None, max_length=500)
@@ -43,11 +63,38 @@ class ProductUpdate(BaseModel):
 class ProductResponse(ProductBase):
     id: int
     is_deleted: bool = Field(default=False, description="Признак мягкого удаления")
+    version: int = Field(default=1, description="Версия записи, растёт при каждом изменении")
 
     class Config:
         from_attributes = True
 
 
+class CategoryBulkUpdateItem(CategoryUpdate):
+    id: int = Field(..., description="ID категории")
+
+
+class ProductBulkUpdateItem(ProductUpdate):
+    id: int = Field(..., description="ID продукта")
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS, description="ID удаляемых записей")
+
+
+class CategoryBulkResult(BaseModel):
+    index: int = Field(..., description="Позиция элемента во входном списке")
+    success: bool
+    data: CategoryResponse | None = None
+    error: str | None = None
+
+
+class ProductBulkResult(BaseModel):
+    index: int = Field(..., description="Позиция элемента во входном списке")
+    success: bool
+    data: ProductResponse | None = None
+    error: str | None = None
+
+
 class ChatMessage(BaseModel):
     message: str = Field(..., min_length=1, description="Текст сообщения для агента")
     thread_id: str | None = Field(None, description="ID потока для поддержания контекста беседы")
@@ -0,0 +1,109 @@
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table
+from sqlalchemy.sql import Select
+
+from .models import Product
+
+SEARCH_NAME_WEIGHT = 10.0
+SEARCH_DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+)
+
+# Выражение должно совпадать с выражением индекса, иначе PostgreSQL его не использует
+_PG_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+_PG_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_products_search_tsv ON products USING gin (({_PG_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+)
+
+products_fts = table("products_fts", column("rowid"))
+
+
+def create_search_index(sync_conn) -> None:
+    dialect = sync_conn.dialect.name
+    if dialect == "sqlite":
+        exists = sync_conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        ).first()
+        if not exists:
+            for ddl in _SQLITE_DDL:
+                sync_conn.exec_driver_sql(ddl)
+            # существующие товары попадают в индекс один раз, дальше его ведут триггеры
+            sync_conn.exec_driver_sql("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        else:
+            for ddl in _SQLITE_DDL[1:]:
+                sync_conn.exec_driver_sql(ddl)
+    elif dialect == "postgresql":
+        for ddl in _PG_DDL:
+            sync_conn.exec_driver_sql(ddl)
+
+
+def search_tokens(query: str) -> list[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(query)]
+
+
+def build_search_query(dialect: str, query: str, tokens: list[str]) -> Select:
+    """Запрос товаров, упорядоченных по релевантности; фильтры добавляет вызывающий код."""
+    if dialect == "sqlite":
+        # каждый токен ищется как префикс: «ноут» находит «ноутбук»
+        match = " ".join(f'"{token}"*' for token in tokens)
+        fts = literal_column("products_fts")
+        return (
+            select(Product)
+            .join(products_fts, products_fts.c.rowid == Product.id)
+            .filter(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, SEARCH_NAME_WEIGHT, SEARCH_DESCRIPTION_WEIGHT))
+        )
+
+    if dialect == "postgresql":
+        document = literal_column(_PG_DOCUMENT)
+        ts_query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        similarity = func.similarity(Product.name, query)
+        return (
+            select(Product)
+            .filter(or_(document.op("@@")(ts_query), Product.name.op("%")(query)))
+            .order_by(
+                (func.ts_rank(document, ts_query) + similarity).desc(),
+                Product.id,
+            )
+        )
+
+    pattern = f"%{query}%"
+    return (
+        select(Product)
+        .filter(or_(Product.name.ilike(pattern), Product.description.ilike(pattern)))
+        .order_by(Product.id)
+    )
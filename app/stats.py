@@ -0,0 +1,132 @@
+"""Агрегаты живых товаров по категориям в таблице category_stats.
+
+Таблицу ведут триггеры на products, поэтому она меняется в той же транзакции при любой записи:
+одиночной, пакетной, каскадной и из очереди записи. Триггеры хранят только число товаров и сумму
+цен: их изменение коммутативно и верно при любом уровне изоляции. Минимум и максимум читаются
+из индекса ``(category_id, is_deleted, price)`` при запросе статистики — пересчёт границы
+в триггере под READ COMMITTED не видит незакоммиченных изменений соседних транзакций.
+
+Запись строки category_stats держит её блокировку до коммита, поэтому записи товаров одной
+категории выполняются по очереди; это цена чтения статистики без прохода по товарам.
+Транзакции, меняющие товары нескольких категорий, заранее блокируют строки статистики
+в порядке ``category_id`` (``lock_category_stats``), чтобы не взаимоблокироваться.
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Category, CategoryStats
+
+_SQLITE_ADD = """
+    INSERT INTO category_stats (category_id, product_count, price_sum)
+    VALUES (new.category_id, 1, new.price)
+    ON CONFLICT (category_id) DO UPDATE SET
+        product_count = product_count + 1,
+        price_sum = price_sum + excluded.price_sum;
+"""
+
+_SQLITE_REMOVE = """
+    UPDATE category_stats SET
+        product_count = product_count - 1,
+        price_sum = CASE WHEN product_count = 1 THEN 0 ELSE price_sum - old.price END
+    WHERE category_id = old.category_id;
+"""
+
+_SQLITE_TRIGGERS = {
+    "category_stats_ai": f"AFTER INSERT ON products WHEN new.is_deleted = 0 BEGIN {_SQLITE_ADD} END",
+    "category_stats_ad": f"AFTER DELETE ON products WHEN old.is_deleted = 0 BEGIN {_SQLITE_REMOVE} END",
+    "category_stats_au_old": f"""
+    AFTER UPDATE OF price, category_id, is_deleted ON products
+    WHEN old.is_deleted = 0 BEGIN {_SQLITE_REMOVE} END
+    """,
+    "category_stats_au_new": f"""
+    AFTER UPDATE OF price, category_id, is_deleted ON products
+    WHEN new.is_deleted = 0 BEGIN {_SQLITE_ADD} END
+    """,
+}
+
+_PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION category_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted THEN
+        UPDATE category_stats SET
+            product_count = product_count - 1,
+            price_sum = CASE WHEN product_count = 1 THEN 0 ELSE price_sum - OLD.price END
+        WHERE category_id = OLD.category_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted THEN
+        INSERT INTO category_stats (category_id, product_count, price_sum)
+        VALUES (NEW.category_id, 1, NEW.price)
+        ON CONFLICT (category_id) DO UPDATE SET
+            product_count = category_stats.product_count + 1,
+            price_sum = category_stats.price_sum + EXCLUDED.price_sum;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+_PG_TRIGGER = """
+CREATE OR REPLACE TRIGGER category_stats_products
+AFTER INSERT OR DELETE OR UPDATE OF price, category_id, is_deleted ON products
+FOR EACH ROW EXECUTE FUNCTION category_stats_apply()
+"""
+
+_REBUILD = (
+    "DELETE FROM category_stats",
+    """
+    INSERT INTO category_stats (category_id, product_count, price_sum)
+    SELECT category_id, count(*), sum(price)
+    FROM products WHERE is_deleted = {false}
+    GROUP BY category_id
+    """,
+)
+
+
+def _rebuild(sync_conn, false: str) -> None:
+    for ddl in _REBUILD:
+        sync_conn.exec_driver_sql(ddl.format(false=false))
+
+
+def create_category_stats(sync_conn) -> None:
+    dialect = sync_conn.dialect.name
+    if dialect == "sqlite":
+        exists = sync_conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'category_stats_ai'"
+        ).first()
+        # триггеры пересоздаются: база с прежними телами триггеров получает текущие
+        for name, body in _SQLITE_TRIGGERS.items():
+            sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+            sync_conn.exec_driver_sql(f"CREATE TRIGGER {name} {body}")
+        if not exists:
+            # уже существующие товары учитываются один раз, дальше таблицу ведут триггеры
+            _rebuild(sync_conn, "0")
+    elif dialect == "postgresql":
+        exists = sync_conn.exec_driver_sql(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'category_stats_products'"
+        ).first()
+        sync_conn.exec_driver_sql(_PG_FUNCTION)
+        sync_conn.exec_driver_sql(_PG_TRIGGER)
+        if not exists:
+            _rebuild(sync_conn, "false")
+
+
+async def lock_category_stats(db: AsyncSession, category_ids) -> None:
+    """Блокирует строки category_stats категорий по возрастанию ID (только PostgreSQL).
+
+    ``category_ids`` — список ID или подзапрос, возвращающий их. Недостающие строки создаются
+    пустыми, чтобы вставка из триггера не ждала чужую вставку той же строки. SQLite
+    сериализует записи блокировкой базы, поэтому там ничего не делается.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    known = select(Category.id).where(Category.id.in_(category_ids)).order_by(Category.id)
+    await db.execute(
+        pg_insert(CategoryStats).from_select(["category_id"], known).on_conflict_do_nothing()
+    )
+    await db.execute(
+        select(CategoryStats.category_id)
+        .where(CategoryStats.category_id.in_(category_ids))
+        .order_by(CategoryStats.category_id)
+        .with_for_update()
+    )
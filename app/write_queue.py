@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from .crud import empty_required_field, update_products_bulk
+from .db.session import AsyncSessionLocal
+from .metrics import Gauge, register, write_queue_batch_size, write_queue_flush_latency, write_queue_updates
+from .models import Product
+from .schemas import ProductBulkUpdateItem
+
+load_dotenv()
+
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "500"))
+WRITE_QUEUE_MAX_DELAY = float(os.getenv("WRITE_QUEUE_MAX_DELAY_SECONDS", "0.01"))
+WRITE_QUEUE_MAX_PENDING = int(os.getenv("WRITE_QUEUE_MAX_PENDING", "10000"))
+WRITE_QUEUE_RETRY_AFTER = float(os.getenv("WRITE_QUEUE_RETRY_AFTER_SECONDS", "1"))
+
+
+class WriteQueueFull(Exception):
+    def __init__(self, message: str, retry_after: float = WRITE_QUEUE_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Pending:
+    # обновления каждого вызывающего хранятся отдельно: чужое некорректное поле не сорвёт его запись
+    __slots__ = ("requests",)
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[dict, asyncio.Future]] = []
+
+
+class ProductWriteQueue:
+    """Отложенная запись обновлений товаров.
+
+    Обновления одного товара, ждущие записи, попадают в одну транзакцию и применяются по
+    порядку поступления, но проверяются и подтверждаются каждое отдельно. Пакет до
+    ``max_batch`` товаров пишется одной транзакцией через ``update_products_bulk`` не позже
+    чем через ``max_delay`` после первого обновления; вызывающий получает результат только
+    после коммита. Если ждут записи ``max_pending``
+    товаров, новые обновления отклоняются с ``WriteQueueFull``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_batch: int = WRITE_QUEUE_MAX_BATCH,
+        max_delay: float = WRITE_QUEUE_MAX_DELAY,
+        max_pending: int = WRITE_QUEUE_MAX_PENDING,
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._pending: dict[int, _Pending] = {}
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, product_id: int, updates: dict) -> Product:
+        if self._closing:
+            raise WriteQueueFull("Очередь записи остановлена")
+        # пустое обязательное поле отклоняем до очереди: NOT NULL сорвал бы всю транзакцию пакета
+        if field := empty_required_field(updates, Product):
+            raise ValueError(f"Поле {field} не может быть пустым")
+
+        entry = self._pending.get(product_id)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                write_queue_updates.inc("rejected")
+                raise WriteQueueFull("Очередь записи переполнена, повторите позже")
+            entry = self._pending[product_id] = _Pending()
+        else:
+            write_queue_updates.inc("coalesced")
+        waiter = asyncio.get_running_loop().create_future()
+        entry.requests.append((updates, waiter))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await waiter
+
+    async def _run(self) -> None:
+        while not (self._closing and not self._pending):
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch and not self._closing:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = {
+                product_id: self._pending.pop(product_id)
+                for product_id in list(self._pending)[:self.max_batch]
+            }
+            if not self._pending and not self._closing:
+                self._wakeup.clear()
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: dict[int, _Pending]) -> None:
+        requests = [
+            (product_id, updates, waiter)
+            for product_id, entry in batch.items()
+            for updates, waiter in entry.requests
+        ]
+        # обновления одного товара выполняются по порядку, каждое получает свою версию
+        items = [ProductBulkUpdateItem(id=product_id, **updates) for product_id, updates, _ in requests]
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                outcomes = await update_products_bulk(db, items)
+        except Exception as e:
+            write_queue_updates.inc("failed", amount=len(requests))
+            for _, _, waiter in requests:
+                _resolve(waiter, error=e)
+            return
+        finally:
+            write_queue_flush_latency.observe(time.perf_counter() - started)
+            write_queue_batch_size.observe(len(batch))
+
+        for (_, _, waiter), (product, error) in zip(requests, outcomes):
+            write_queue_updates.inc("written" if product is not None else "invalid")
+            _resolve(waiter, result=product, error=ValueError(error) if error else None)
+
+    async def stop(self) -> None:
+        """Дописывает всё, что ждёт записи, и останавливает фоновую задачу."""
+        self._closing = True
+        self._wakeup.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+
+
+def _resolve(waiter: asyncio.Future, *, result=None, error: BaseException | None = None) -> None:
+    # клиент мог отключиться, не дождавшись коммита: запись всё равно выполнена
+    if waiter.done():
+        return
+    if error is not None:
+        waiter.set_exception(error)
+    else:
+        waiter.set_result(result)
+
+
+product_write_queue = ProductWriteQueue()
+
+register(Gauge("write_queue_pending", "Товары, ждущие записи в очереди", product_write_queue.pending))
@@ -0,0 +1,300 @@
+"""Офлайн-бенчмарк агента: скомпилированный граф, поддельная модель и заполненный каталог.
+
+    python -m benchmarks.agent --requests 200 --concurrency 1,8,32 --llm-latency 0.05 --json agent.json
+
+Модель не ходит в сеть: по сценарию из сообщения пользователя она детерминированно выдаёт
+цепочку вызовов инструментов и ждёт заданную задержку. Для каждого запроса меряется время
+целиком и по составляющим: модель, узел инструментов, запросы каталога и чекпоинтера.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .common import (
+    collect_queries,
+    print_table,
+    seed_catalog,
+    summarize,
+    track_queries,
+    use_database,
+    write_results,
+)
+
+SCENARIOS = ("lookup", "create", "update", "batch", "parallel")
+
+
+def _call(tool: str, **args) -> dict:
+    return {"name": tool, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+
+def plan(scenario: str, args: dict) -> list[list[dict]]:
+    """Шаги сценария: список вызовов инструментов на каждый ход модели."""
+    category_id, product_id = args["category_id"], args["product_id"]
+    if scenario == "lookup":
+        return [
+            [_call("get_category_id_by_name", name=f"Категория {category_id}")],
+            [_call("get_product", product_id=product_id)],
+        ]
+    if scenario == "create":
+        return [
+            [_call("get_category_id_by_name", name=f"Категория {category_id}")],
+            [_call("create_product", name=f"Новый товар {product_id}", price=99.9, category_id=category_id)],
+        ]
+    if scenario == "update":
+        return [[_call("update_product", product_id=product_id, price=round(10 + product_id % 90, 2))]]
+    if scenario == "batch":
+        return [
+            [_call("get_categories_by_names", names=[f"Категория {category_id}"])],
+            [_call("create_products", products=[
+                {"name": f"Пакетный товар {product_id}-{n}", "price": 10 + n, "category_id": category_id}
+                for n in range(10)
+            ])],
+        ]
+    if scenario == "parallel":
+        return [[_call("get_product", product_id=product_id + n) for n in range(5)]]
+    raise ValueError(f"Неизвестный сценарий {scenario}")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Поддельная модель: сообщение пользователя вида ``bench <сценарий> <json>`` задаёт план."""
+
+    latency: float = 0.05
+    jitter: float = 0.0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-scripted"
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        turn_start = max(i for i, message in enumerate(messages) if isinstance(message, HumanMessage))
+        _, scenario, raw_args = messages[turn_start].content.split(" ", 2)
+        steps = plan(scenario, json.loads(raw_args))
+        step = sum(isinstance(message, AIMessage) for message in messages[turn_start:])
+        if step < len(steps):
+            return AIMessage(content="", tool_calls=steps[step])
+        return AIMessage(content=f"Сценарий {scenario} выполнен")
+
+    def _delay(self, messages: list[BaseMessage]) -> float:
+        if not self.jitter:
+            return self.latency
+        rng = random.Random(f"{self.seed}:{len(messages)}:{messages[-1].content}")
+        return max(self.latency + rng.uniform(-self.jitter, self.jitter), 0.0)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay(messages))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay(messages))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+class Timings(BaseCallbackHandler):
+    """Собирает время модели и узлов графа одного запроса."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.started: dict[Any, Any] = {}
+        self.llm: list[float] = []
+        self.nodes: dict[str, list[float]] = {"agent": [], "tools": []}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self.started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        if run_id in self.started:
+            self.llm.append(time.perf_counter() - self.started.pop(run_id))
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        name = kwargs.get("name")
+        if name in self.nodes and (metadata or {}).get("langgraph_node") == name:
+            self.started[run_id] = (name, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        entry = self.started.get(run_id)
+        if isinstance(entry, tuple):
+            del self.started[run_id]
+            self.nodes[entry[0]].append(time.perf_counter() - entry[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self.on_chain_end(None, run_id=run_id)
+
+
+def build_requests(count: int, scenarios: list[str], categories: int, products: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        args = {"category_id": rng.randint(1, categories), "product_id": rng.randint(1, max(products - 5, 1))}
+        requests.append(f"bench {scenarios[i % len(scenarios)]} {json.dumps(args)}")
+    return requests
+
+
+async def run_level(agent_app, requests: list[str], concurrency: int, turns: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[dict] = []
+    errors: dict[str, int] = {}
+
+    async def one(index: int, text: str) -> None:
+        async with semaphore:
+            thread_id = f"bench-{concurrency}-{index // turns}"
+            timings = Timings()
+            started = time.perf_counter()
+            with collect_queries() as queries:
+                try:
+                    await agent_app.ainvoke(
+                        {"messages": [HumanMessage(content=text)]},
+                        config={"configurable": {"thread_id": thread_id}, "callbacks": [timings]},
+                    )
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    return
+            total = time.perf_counter() - started
+            catalog_db = queries.by_kind.get("catalog", [0, 0.0])
+            checkpoint_db = queries.by_kind.get("checkpoint", [0, 0.0])
+            samples.append({
+                "total": total,
+                "llm": sum(timings.llm),
+                "agent_steps": len(timings.nodes["agent"]),
+                "agent_other": sum(timings.nodes["agent"]) - sum(timings.llm),
+                "tools": sum(timings.nodes["tools"]),
+                "tool_steps": len(timings.nodes["tools"]),
+                "catalog_db": catalog_db[1],
+                "catalog_queries": catalog_db[0],
+                "checkpoint_db": checkpoint_db[1],
+                "checkpoint_queries": checkpoint_db[0],
+                "graph_other": total - sum(timings.nodes["agent"]) - sum(timings.nodes["tools"]),
+            })
+
+    # Ходы одного потока идут по порядку, потоки — параллельно
+    async def thread(indexes: range) -> None:
+        for index in indexes:
+            await one(index, requests[index])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        thread(range(start, min(start + turns, len(requests))))
+        for start in range(0, len(requests), turns)
+    ))
+    elapsed = time.perf_counter() - started
+
+    def ms(key: str) -> dict:
+        return summarize([sample[key] * 1000 for sample in samples])
+
+    agent_steps = sum(sample["agent_steps"] for sample in samples) or 1
+    tool_steps = sum(sample["tool_steps"] for sample in samples) or 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "completed": len(samples),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            key: ms(key)
+            for key in ("total", "llm", "agent_other", "tools", "catalog_db", "checkpoint_db", "graph_other")
+        },
+        "per_step_ms": {
+            "llm": sum(sample["llm"] for sample in samples) * 1000 / agent_steps,
+            "agent_other": sum(sample["agent_other"] for sample in samples) * 1000 / agent_steps,
+            "tools": sum(sample["tools"] for sample in samples) * 1000 / tool_steps,
+            "catalog_db": sum(sample["catalog_db"] for sample in samples) * 1000 / tool_steps,
+        },
+        "queries_per_request": {
+            "catalog": sum(sample["catalog_queries"] for sample in samples) / max(len(samples), 1),
+            "checkpoint": sum(sample["checkpoint_queries"] for sample in samples) / max(len(samples), 1),
+        },
+    }
+
+
+def report(levels: list[dict]) -> None:
+    print_table(
+        ["conc", "rps", "p50", "p95", "p99", "llm p50", "tools p50", "ckpt db p50", "graph p50", "errors"],
+        [
+            [
+                level["concurrency"],
+                level["throughput_rps"],
+                level["latency_ms"]["total"]["p50"],
+                level["latency_ms"]["total"]["p95"],
+                level["latency_ms"]["total"]["p99"],
+                level["latency_ms"]["llm"]["p50"],
+                level["latency_ms"]["tools"]["p50"],
+                level["latency_ms"]["checkpoint_db"]["p50"],
+                level["latency_ms"]["graph_other"]["p50"],
+                sum(level["errors"].values()),
+            ]
+            for level in levels
+        ],
+    )
+    print("\nНа один шаг, мс:")
+    print_table(
+        ["conc", "llm", "agent other", "tools", "catalog db", "catalog q/req", "ckpt q/req"],
+        [
+            [
+                level["concurrency"],
+                level["per_step_ms"]["llm"],
+                level["per_step_ms"]["agent_other"],
+                level["per_step_ms"]["tools"],
+                level["per_step_ms"]["catalog_db"],
+                level["queries_per_request"]["catalog"],
+                level["queries_per_request"]["checkpoint"],
+            ]
+            for level in levels
+        ],
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.agent import graph
+    from app.agent.resilience import guarded
+    from app.db.session import engine, init_db
+
+    graph.chain = graph.prompt | guarded(
+        ScriptedChatModel(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    )
+    await init_db()
+    await seed_catalog(engine, args.categories, args.products, seed=args.seed)
+    track_queries(engine)
+
+    scenarios = args.scenarios.split(",")
+    levels = []
+    for concurrency in (int(value) for value in args.concurrency.split(",")):
+        requests = build_requests(args.requests, scenarios, args.categories, args.products, args.seed)
+        levels.append(await run_level(graph.app, requests, concurrency, args.turns))
+
+    report(levels)
+    if args.json:
+        write_results(args.json, "agent", vars(args), levels)
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк агента с поддельной моделью")
+    parser.add_argument("--requests", type=int, default=200, help="запросов на каждый уровень параллелизма")
+    parser.add_argument("--concurrency", default="1,8,32", help="уровни параллелизма через запятую")
+    parser.add_argument("--turns", type=int, default=1, help="ходов в одном потоке беседы")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"из {', '.join(SCENARIOS)}")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="задержка модели, с")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="разброс задержки модели, с")
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite-база")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="куда сохранить результаты")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    use_database(arguments.database_url, "agent")
+    asyncio.run(main(arguments))
@@ -0,0 +1,285 @@
+"""Нагрузочный бенчмарк HTTP API каталога на заполненной базе.
+
+    python -m benchmarks.api --categories 1000 --products 1000000 --mode both --concurrency 32 --json api.json
+
+Приложение запускается в этом же процессе: ``inprocess`` — через ASGI-транспорт httpx без сети,
+``uvicorn`` — настоящим сервером на локальном порту (``--url`` — уже запущенный сервер).
+Клиенты работают по замкнутому циклу и выбирают операции по весам ``--mix``. Для каждой
+операции выводятся пропускная способность, перцентили времени ответа, ошибки и число
+SQL-запросов на запрос (для внешнего сервера запросы не считаются).
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import time
+from collections.abc import Callable
+
+from .common import (
+    collect_queries,
+    print_table,
+    seed_catalog,
+    summarize,
+    track_queries,
+    use_database,
+    write_results,
+)
+
+OP_HEADER = "x-bench-op"
+DEFAULT_MIX = "get=40,list=20,search=5,get_category=5,create=10,patch=15,delete=5"
+
+
+class QueryCounter:
+    """ASGI-обёртка: считает SQL-запросы каждой операции на стороне сервера."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.queries: dict[str, list[int]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        op = dict(scope["headers"]).get(OP_HEADER.encode(), b"").decode() or "other"
+        with collect_queries() as stats:
+            await self.app(scope, receive, send)
+        self.queries.setdefault(op, []).append(stats.count)
+
+
+class Workload:
+    """Выбор операций и их параметров; созданные в прогоне товары удаляются в первую очередь."""
+
+    def __init__(self, categories: int, products: int, mix: dict[str, int], seed: int) -> None:
+        self.categories = categories
+        self.products = products
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.created: list[int] = []
+        self.rng = random.Random(seed)
+
+    def product_id(self) -> int:
+        return self.rng.randint(1, self.products)
+
+    def category_id(self) -> int:
+        return self.rng.randint(1, self.categories)
+
+    def next(self) -> tuple[str, str, str, dict]:
+        op = self.rng.choices(self.ops, self.weights)[0]
+        if op == "get":
+            return op, "GET", f"/products/{self.product_id()}", {}
+        if op == "list":
+            sort = self.rng.choice(["id", "name", "price", "-price"])
+            params = {"limit": 50, "category_id": self.category_id(), "sort": sort}
+            return op, "GET", "/products/", {"params": params}
+        if op == "search":
+            params = {"q": f"Товар {self.rng.randint(1, 999)}", "limit": 20}
+            return op, "GET", "/products/search", {"params": params}
+        if op == "get_category":
+            return op, "GET", f"/categories/{self.category_id()}", {}
+        if op == "create":
+            return op, "POST", "/products/", {"json": {
+                "name": f"Нагрузочный товар {self.rng.randint(1, 10 ** 9)}",
+                "price": round(self.rng.uniform(1, 10_000), 2),
+                "category_id": self.category_id(),
+            }}
+        if op == "patch":
+            payload = {"price": round(self.rng.uniform(1, 10_000), 2)}
+            return op, "PATCH", f"/products/{self.product_id()}", {"json": payload}
+        if op == "delete":
+            product_id = self.created.pop() if self.created else self.product_id()
+            return op, "DELETE", f"/products/{product_id}", {}
+        raise ValueError(f"Неизвестная операция {op}")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        mix[op.strip()] = int(weight or 1)
+    return mix
+
+
+async def drive(
+    client,
+    workload: Workload,
+    *,
+    concurrency: int,
+    requests: int,
+    duration: float,
+) -> tuple[dict[str, list[float]], dict[str, dict[str, int]], float]:
+    latencies: dict[str, list[float]] = {}
+    statuses: dict[str, dict[str, int]] = {}
+    remaining = {"count": requests}
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        while remaining["count"] > 0 and (deadline is None or time.perf_counter() < deadline):
+            remaining["count"] -= 1
+            op, method, url, kwargs = workload.next()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers={OP_HEADER: op}, **kwargs)
+                status = str(response.status_code)
+            except Exception as e:
+                response, status = None, type(e).__name__
+            latencies.setdefault(op, []).append((time.perf_counter() - started) * 1000)
+            counts = statuses.setdefault(op, {})
+            counts[status] = counts.get(status, 0) + 1
+            if op == "create" and response is not None and response.is_success:
+                workload.created.append(response.json()["id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def collect(
+    latencies: dict[str, list[float]],
+    statuses: dict[str, dict[str, int]],
+    elapsed: float,
+    queries: dict[str, list[int]] | None,
+) -> dict:
+    endpoints = {}
+    for op, values in sorted(latencies.items()):
+        counts = queries.get(op, []) if queries is not None else []
+        endpoints[op] = {
+            "requests": len(values),
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+            "latency_ms": summarize(values),
+            "statuses": statuses[op],
+            # 404 ожидаем: удаления и случайные ID попадают в уже удалённые товары
+            "errors": sum(
+                n for status, n in statuses[op].items() if not status.startswith("2") and status != "404"
+            ),
+            "queries_per_request": sum(counts) / len(counts) if counts else None,
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "latency_ms": summarize([value for values in latencies.values() for value in values]),
+        "endpoints": endpoints,
+    }
+
+
+def report(mode: str, result: dict) -> None:
+    print(f"\n{mode}: {result['requests']} запросов за {result['elapsed_s']:.1f} с, {result['throughput_rps']:.1f} rps")
+    print_table(
+        ["op", "requests", "rps", "p50", "p95", "p99", "errors", "queries"],
+        [
+            [
+                op,
+                stats["requests"],
+                stats["throughput_rps"],
+                stats["latency_ms"]["p50"],
+                stats["latency_ms"]["p95"],
+                stats["latency_ms"]["p99"],
+                stats["errors"],
+                "-" if stats["queries_per_request"] is None else f"{stats['queries_per_request']:.1f}",
+            ]
+            for op, stats in result["endpoints"].items()
+        ],
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_inprocess(app: QueryCounter, make_workload: Callable[[], Workload], args) -> dict:
+    import httpx
+
+    app.queries.clear()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies, statuses, elapsed = await drive(
+            client, make_workload(), concurrency=args.concurrency, requests=args.requests, duration=args.duration
+        )
+    return collect(latencies, statuses, elapsed, app.queries)
+
+
+async def run_uvicorn(app: QueryCounter, make_workload: Callable[[], Workload], args) -> dict:
+    import httpx
+    import uvicorn
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+    app.queries.clear()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            latencies, statuses, elapsed = await drive(
+                client, make_workload(), concurrency=args.concurrency, requests=args.requests, duration=args.duration
+            )
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await serving
+    return collect(latencies, statuses, elapsed, app.queries if server is not None else None)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.db.session import engine, init_db
+    from app.main import app
+    from app.write_queue import product_write_queue
+
+    await init_db()
+    started = time.perf_counter()
+    await seed_catalog(engine, args.categories, args.products, seed=args.seed)
+    print(f"Каталог готов за {time.perf_counter() - started:.1f} с: {args.categories} категорий, {args.products} товаров")
+    track_queries(engine)
+
+    counted = QueryCounter(app)
+    mix = parse_mix(args.mix)
+    modes = ["inprocess", "uvicorn"] if args.mode == "both" else [args.mode]
+    results = {}
+    for mode in modes:
+        runner = run_inprocess if mode == "inprocess" else run_uvicorn
+        results[mode] = await runner(
+            counted, lambda: Workload(args.categories, args.products, mix, args.seed), args
+        )
+        report(mode, results[mode])
+
+    if args.json:
+        write_results(args.json, "api", vars(args), results)
+    await product_write_queue.stop()
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк HTTP API каталога")
+    parser.add_argument("--categories", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="both")
+    parser.add_argument("--url", default=None, help="адрес уже запущенного сервера для режима uvicorn")
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных клиентов")
+    parser.add_argument("--requests", type=int, default=5000, help="запросов на режим")
+    parser.add_argument("--duration", type=float, default=0, help="ограничение по времени на режим, с")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса операций: get, list, search, get_category, create, patch, delete")
+    parser.add_argument("--no-cache", action="store_true", help="отключить кэш чтений (CACHE_ENABLED=false)")
+    parser.add_argument("--write-queue", action="store_true", help="PATCH через очередь записи (WRITE_QUEUE_ENABLED=true)")
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite-база")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="куда сохранить результаты")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    use_database(arguments.database_url, "api")
+    if arguments.no_cache:
+        os.environ["CACHE_ENABLED"] = "false"
+    if arguments.write_queue:
+        os.environ["WRITE_QUEUE_ENABLED"] = "true"
+    asyncio.run(main(arguments))
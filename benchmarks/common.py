@@ -0,0 +1,156 @@
+"""Общие помощники бенчмарков: временная база, наполнение каталога, учёт запросов, отчёты."""
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+SEED_BATCH_SIZE = 10_000
+
+
+def use_database(url: str | None, name: str) -> str:
+    """Выставляет DATABASE_URL до импорта ``app``: движок создаётся при импорте модуля."""
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="giga-bench-"), f"{name}.db")
+        url = f"sqlite+aiosqlite:///{path}"
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(values: list[float]) -> dict:
+    """Сводка по выборке в миллисекундах."""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, params: dict, results: object) -> None:
+    payload = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    by_kind: dict[str, list[float]] = field(default_factory=dict)
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        entry = self.by_kind.setdefault(kind, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+_current_queries: ContextVar[QueryStats | None] = ContextVar("bench_queries", default=None)
+
+
+def query_kind(statement: str) -> str:
+    # Запросы чекпоинтера отделяются от запросов каталога по таблицам
+    return "checkpoint" if "chat_" in statement else "catalog"
+
+
+def track_queries(engine) -> None:
+    """Подписывается на события движка и относит каждый запрос к текущему ``collect_queries``."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("bench_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["bench_started"].pop()
+        stats = _current_queries.get()
+        if stats is not None:
+            stats.add(query_kind(statement), time.perf_counter() - started)
+
+
+@contextmanager
+def collect_queries():
+    stats = QueryStats()
+    token = _current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_queries.reset(token)
+
+
+async def seed_catalog(engine, categories: int, products: int, *, seed: int = 0) -> None:
+    """Заполняет пустую базу: категории «Категория N» с ID 1..N и товары, распределённые по ним."""
+    from sqlalchemy import func, insert, select, text
+
+    from app.models import Category, Product
+
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        if await conn.scalar(select(func.count()).select_from(Category)):
+            return
+        for start in range(0, categories, SEED_BATCH_SIZE):
+            await conn.execute(insert(Category), [
+                {"id": i, "name": f"Категория {i}", "description": f"Описание категории {i}"}
+                for i in range(start + 1, min(start + SEED_BATCH_SIZE, categories) + 1)
+            ])
+        for start in range(0, products, SEED_BATCH_SIZE):
+            await conn.execute(insert(Product), [
+                {
+                    "id": i,
+                    "name": f"Товар {i}",
+                    "description": f"Описание товара {i}",
+                    "price": round(rng.uniform(1, 10_000), 2),
+                    "category_id": rng.randint(1, categories),
+                }
+                for i in range(start + 1, min(start + SEED_BATCH_SIZE, products) + 1)
+            ])
+        if conn.dialect.name == "postgresql":
+            # ID заданы явно, последовательности нужно сдвинуть вручную
+            for table in ("categories", "products"):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+
+
+def print_table(headers: list[str], rows: list[list[object]]) -> None:
+    cells = [[f"{value:.1f}" if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max(len(str(header)), *(len(row[i]) for row in cells)) for i, header in enumerate(headers)]
+    print("  ".join(header.rjust(width) for header, width in zip(headers, widths)))
+    for row in cells:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
@@ -0,0 +1,159 @@
+"""Бенчмарк сериализации страниц списка товаров: строк в секунду до и после перехода на строки колонок.
+
+    python -m benchmarks.serialization --products 100000 --page-sizes 100,1000 --rounds 50 --json serialization.json
+
+Путь ``orm`` повторяет прежний обработчик: ORM-объекты, ``ProductResponse.model_validate`` на каждый
+элемент, проверка ``response_model`` и ``JSONResponse``. Путь ``rows`` — текущий: выборка колонок
+схемы ответа в словари и ``ORJSONResponse`` без повторной валидации. Каждый путь меряется дважды:
+с запросом к базе (``db``) и на странице из кэша (``cached``), где остаются только сборка и кодирование.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from .common import print_table, seed_catalog, summarize, use_database, write_results
+
+PIPELINES = ("orm", "rows")
+
+
+def _page_query(columns, page_size: int, start: int):
+    from sqlalchemy import select
+
+    from app.models import Product
+
+    return (
+        select(*columns)
+        .filter(Product.is_deleted.is_(False), Product.id > start)
+        .order_by(Product.id)
+        .limit(page_size)
+    )
+
+
+async def encode_orm(products: list) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app.schemas import ProductResponse
+
+    field = create_response_field(name="Response", type_=list[ProductResponse])
+    content = await serialize_response(
+        field=field, response_content=[ProductResponse.model_validate(product) for product in products]
+    )
+    return JSONResponse(content).body
+
+
+async def encode_rows(rows: list[dict]) -> bytes:
+    from fastapi.responses import ORJSONResponse
+
+    return ORJSONResponse(rows).body
+
+
+async def load_orm(db, page_size: int, start: int) -> list:
+    from app.models import Product
+
+    result = await db.execute(_page_query([Product], page_size, start))
+    return list(result.scalars().all())
+
+
+async def load_rows(db, page_size: int, start: int) -> list[dict]:
+    from app.crud import PRODUCT_ROW_COLUMNS
+
+    result = await db.execute(_page_query(PRODUCT_ROW_COLUMNS, page_size, start))
+    return [dict(row) for row in result.mappings()]
+
+
+def from_cache_orm(snapshots: list[dict]) -> list:
+    from app.models import Product
+
+    # прежний кэш хранил снимки колонок и пересобирал из них ORM-объекты
+    return [Product(**values) for values in snapshots]
+
+
+async def measure(pipeline: str, page_size: int, rounds: int, products: int, rng: random.Random) -> dict:
+    from app.crud import _snapshot
+    from app.db.session import AsyncSessionLocal
+
+    load, encode = (load_orm, encode_orm) if pipeline == "orm" else (load_rows, encode_rows)
+    starts = [rng.randint(0, max(products - page_size, 0)) for _ in range(rounds)]
+    db_times, cached_times, size = [], [], 0
+
+    async with AsyncSessionLocal() as db:
+        cached = await load(db, page_size, 0)
+        if pipeline == "orm":
+            cached = [_snapshot(product) for product in cached]
+        for start in starts:
+            started = time.perf_counter()
+            body = await encode(await load(db, page_size, start))
+            db_times.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+            size = len(body)
+
+            started = time.perf_counter()
+            await encode(from_cache_orm(cached) if pipeline == "orm" else cached)
+            cached_times.append((time.perf_counter() - started) * 1000)
+
+    def rate(times: list[float]) -> float:
+        return page_size * len(times) / (sum(times) / 1000) if times else 0.0
+
+    return {
+        "pipeline": pipeline,
+        "page_size": page_size,
+        "body_bytes": size,
+        "db_ms": summarize(db_times),
+        "cached_ms": summarize(cached_times),
+        "db_rows_per_s": rate(db_times),
+        "cached_rows_per_s": rate(cached_times),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.db.session import engine, init_db
+
+    await init_db()
+    await seed_catalog(engine, args.categories, args.products, seed=args.seed)
+
+    results = []
+    for page_size in (int(value) for value in args.page_sizes.split(",")):
+        for pipeline in PIPELINES:
+            # прогрев: первый вызов создаёт валидаторы pydantic и кэш компиляции SQL
+            await measure(pipeline, page_size, 3, args.products, random.Random(args.seed))
+            results.append(await measure(pipeline, page_size, args.rounds, args.products, random.Random(args.seed)))
+
+    print_table(
+        ["page", "pipeline", "db rows/s", "db p50 ms", "cached rows/s", "cached p50 ms", "bytes"],
+        [
+            [
+                result["page_size"],
+                result["pipeline"],
+                result["db_rows_per_s"],
+                result["db_ms"]["p50"],
+                result["cached_rows_per_s"],
+                result["cached_ms"]["p50"],
+                result["body_bytes"],
+            ]
+            for result in results
+        ],
+    )
+    if args.json:
+        write_results(args.json, "serialization", vars(args), results)
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации списков товаров")
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--page-sizes", default="100,1000", help="размеры страниц через запятую")
+    parser.add_argument("--rounds", type=int, default=50, help="страниц на каждый замер")
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite-база")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="куда сохранить результаты")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    use_database(arguments.database_url, "serialization")
+    asyncio.run(main(arguments))
@@ -0,0 +1,116 @@
+"""Бенчмарк холодного старта: время импорта приложения и время до первого ответа CRUD API.
+
+    python -m benchmarks.startup --runs 5 --json startup.json
+
+Каждый замер идёт в новом процессе. Режимы: ``crud`` — воркер без агента (AGENT_ENABLED=false),
+``lazy`` — агент грузится при первом обращении к /chat, ``warmup`` — агент грузится в фоне после
+старта (AGENT_WARMUP=true). Отдельно меряется загрузка самого агента.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from .common import print_table, summarize, use_database, write_results
+
+MODES = {
+    "crud": {"AGENT_ENABLED": "false"},
+    "lazy": {"AGENT_ENABLED": "true", "AGENT_WARMUP": "false"},
+    "warmup": {"AGENT_ENABLED": "true", "AGENT_WARMUP": "true"},
+}
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _env(extra: dict) -> dict:
+    return {**os.environ, "PYTHONWARNINGS": "ignore", **extra}
+
+
+def measure_import(module: str, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        env=_env(env), capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(env: dict, timeout: float) -> float:
+    """Время от запуска uvicorn до первого успешного ответа ``GET /products/``."""
+    import httpx
+
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=_env(env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get("/products/", params={"limit": 1}).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise TimeoutError(f"Сервер не ответил за {timeout} с")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args: argparse.Namespace) -> None:
+    results = {}
+    for mode in args.modes.split(","):
+        env = MODES[mode]
+        imports = [measure_import("app.main", env) * 1000 for _ in range(args.runs)]
+        first = [measure_first_response(env, args.timeout) * 1000 for _ in range(args.runs)]
+        results[mode] = {"import_ms": summarize(imports), "first_response_ms": summarize(first)}
+    agent = [measure_import("app.agent.service", {}) * 1000 for _ in range(args.runs)]
+    results["agent_load"] = {"import_ms": summarize(agent)}
+
+    print_table(
+        ["mode", "import p50", "import max", "first response p50", "first response max"],
+        [
+            [
+                mode,
+                stats["import_ms"]["p50"],
+                stats["import_ms"]["max"],
+                stats["first_response_ms"]["p50"],
+                stats["first_response_ms"]["max"],
+            ]
+            for mode, stats in results.items()
+            if "first_response_ms" in stats
+        ],
+    )
+    print(f"\nЗагрузка агента (app.agent.service): p50 {results['agent_load']['import_ms']['p50']:.1f} мс")
+    if args.json:
+        write_results(args.json, "startup", vars(args), results)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта приложения")
+    parser.add_argument("--runs", type=int, default=5, help="замеров на каждый режим")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"из {', '.join(MODES)}")
+    parser.add_argument("--timeout", type=float, default=60, help="ожидание первого ответа, с")
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite-база")
+    parser.add_argument("--json", default=None, help="куда сохранить результаты")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    use_database(arguments.database_url, "startup")
+    main(arguments)